@@ -2,7 +2,7 @@
 Agent modules for the Instagram-to-Social Media transformation system
 """
 
-from .instagram_agent import InstagramAgent
+from .instagram_agent import InstagramAgent, VideoData
 from .content_transformer_agent import ContentTransformerAgent
 from .twitter_agent import TwitterAgent
 from .linkedin_agent import LinkedInAgent
@@ -10,6 +10,7 @@ from .orchestrator_agent import OrchestratorAgent
 
 __all__ = [
     "InstagramAgent",
+    "VideoData",
     "ContentTransformerAgent", 
     "TwitterAgent",
     "LinkedInAgent",
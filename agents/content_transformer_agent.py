@@ -2,12 +2,33 @@
 Content Transformer Agent - Responsible for transforming Instagram content for different platforms
 """
 import asyncio
-from typing import Dict, List, Optional
+from dataclasses import asdict
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, List, Optional, Tuple
 from crewai import Agent, Task
 from loguru import logger
 from services.content_analyzer import ContentAnalyzer
 from utils.text_generator import TextGenerator
-from config import settings, CONTENT_PROMPTS, PLATFORM_CONFIGS
+from utils.llm_cache import LLMCache
+from .instagram_agent import VideoData
+from config import settings, CONTENT_PROMPTS, PLATFORM_CONFIGS, PROMPT_BUILDERS
+
+
+def _scan_hashtags(text: str) -> List[str]:
+    """Extract '#word' hashtags from text in a single pass (word = letters, digits, underscore)"""
+    hashtags = []
+    n = len(text)
+    i = text.find('#')
+    while i != -1:
+        j = i + 1
+        while j < n and (text[j].isalnum() or text[j] == '_'):
+            j += 1
+        if j > i + 1:
+            hashtags.append(text[i:j])
+        i = text.find('#', j if j > i + 1 else i + 1)
+    return hashtags
+
 
 class ContentTransformerAgent:
     """Agent responsible for transforming content for different social media platforms"""
@@ -15,9 +36,22 @@ class ContentTransformerAgent:
     def __init__(self):
         self.content_analyzer = ContentAnalyzer()
         self.text_generator = TextGenerator()
+        self.llm_cache = LLMCache()
+        
+        # Platform tables are read on every transformation, bind them once
+        self._prompts = PROMPT_BUILDERS
+        self._cfgs = PLATFORM_CONFIGS
         
-        # Define the CrewAI agent
-        self.agent = Agent(
+        # Static part of each prompt template, shared by every video (cacheable by the LLM provider)
+        self._prompt_prefixes = {
+            platform: template.partition('{')[0] for platform, template in CONTENT_PROMPTS.items()
+        }
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _get_agent(cls) -> Agent:
+        """Build the CrewAI agent once per process"""
+        return Agent(
             role="Content Transformation Specialist",
             goal="Transform Instagram video content into platform-optimized posts for Twitter and LinkedIn",
             backstory="""You are an expert content strategist who understands the nuances 
@@ -28,7 +62,12 @@ class ContentTransformerAgent:
             allow_delegation=False
         )
     
-    async def transform_content(self, video_data: Dict, target_platforms: List[str]) -> Dict:
+    @property
+    def agent(self) -> Agent:
+        """Shared CrewAI agent definition"""
+        return type(self)._get_agent()
+    
+    async def transform_content(self, video_data: VideoData, target_platforms: List[str]) -> Dict:
         """
         Transform video content for specified platforms
         
@@ -40,83 +79,163 @@ class ContentTransformerAgent:
             Dictionary with transformed content for each platform
         """
         try:
-            logger.info(f"Transforming content {video_data['id']} for platforms: {target_platforms}")
+            logger.info("Transforming content {} for platforms: {}", video_data.id, target_platforms)
+            
+            platforms = [platform for platform in target_platforms if platform in self._cfgs]
+            if not platforms:
+                return {}
             
-            # Analyze video content
-            content_analysis = await self.content_analyzer.analyze_video_content(
-                video_data['video_path'],
-                video_data['caption']
+            # Analyze video content in the background; platforms await it only when needed
+            analysis_task = asyncio.create_task(
+                self.content_analyzer.analyze_video_content(
+                    video_data.video_path,
+                    video_data.caption
+                )
             )
             
             transformed_content = {}
             
-            for platform in target_platforms:
-                if platform in PLATFORM_CONFIGS:
-                    platform_content = await self._transform_for_platform(
-                        video_data, content_analysis, platform
-                    )
-                    transformed_content[platform] = platform_content
+            # Platform transformations are independent LLM calls, run them concurrently
+            try:
+                results = await asyncio.gather(
+                    *[self._transform_for_platform(video_data, analysis_task, platform)
+                      for platform in platforms],
+                    return_exceptions=True
+                )
+            finally:
+                # Cancel the analysis if no platform got far enough to await it, and retrieve its outcome
+                analysis_task.cancel()
+                await asyncio.gather(analysis_task, return_exceptions=True)
+            
+            for platform, platform_content in zip(platforms, results):
+                if isinstance(platform_content, Exception):
+                    logger.error(f"Error transforming for {platform}: {str(platform_content)}")
+                    continue
+                transformed_content[platform] = platform_content
             
             return transformed_content
             
         except Exception as e:
-            logger.error(f"Error transforming content {video_data.get('id', 'unknown')}: {str(e)}")
+            logger.error(f"Error transforming content {video_data.id}: {str(e)}")
             return {}
     
-    async def _transform_for_platform(self, video_data: Dict, analysis: Dict, platform: str) -> Dict:
+    async def _transform_for_platform(self, video_data: VideoData, analysis_task: asyncio.Task, platform: str) -> Dict:
         """
         Transform content for a specific platform
         
         Args:
             video_data: Original video data
-            analysis: Content analysis results
+            analysis_task: Task resolving to the content analysis results
             platform: Target platform ('twitter' or 'linkedin')
             
         Returns:
             Platform-specific content dictionary
         """
         try:
-            platform_config = PLATFORM_CONFIGS[platform]
-            
-            # Generate platform-specific text
-            prompt = CONTENT_PROMPTS[platform].format(
-                content=video_data['caption'],
-                description=analysis.get('description', '')
+            cfg = self._cfgs[platform]
+            max_len, hlimit, vmax_dur, vmax_sz = (
+                cfg['max_length'], cfg['hashtag_limit'],
+                cfg['video_max_duration'], cfg['video_max_size']
             )
             
-            generated_text = await self.text_generator.generate_text(
-                prompt,
-                max_length=platform_config['max_length']
+            # Prepare media while the analysis is still running
+            media_info = await self._prepare_media_for_platform(
+                video_data, vmax_dur, vmax_sz
             )
             
-            # Extract hashtags and mentions
-            hashtags = self._extract_hashtags(
-                generated_text, 
-                video_data.get('hashtags', []),
-                platform_config['hashtag_limit']
+            analysis = await analysis_task
+            
+            # Generate platform-specific text, reusing cached output for repeated prompts
+            prompt = self._build_prompt(video_data, analysis, platform)
+            generated_text = self.llm_cache.get(platform, prompt)
+            if generated_text is None:
+                generated_text, is_fallback = await self.text_generator.generate_text_with_status(
+                    prompt,
+                    max_length=max_len
+                )
+                # Canned fallback text is not model output, so it must not outlive the outage
+                if not is_fallback:
+                    self.llm_cache.set(platform, prompt, generated_text)
+            
+            return self._build_platform_content(
+                video_data, analysis, platform, generated_text, media_info, hlimit
             )
             
-            # Prepare media
-            media_info = await self._prepare_media_for_platform(
-                video_data, platform_config
+        except Exception as e:
+            logger.error(f"Error transforming for {platform}: {str(e)}")
+            return {}
+    
+    async def _transform_platform_batch(self, analyzed_videos: List[Tuple[VideoData, Dict]], platform: str) -> List[Dict]:
+        """
+        Transform several analyzed videos for one platform with a single batched generation
+        
+        Args:
+            analyzed_videos: List of (video_data, analysis) pairs
+            platform: Target platform ('twitter' or 'linkedin')
+            
+        Returns:
+            Platform-specific content dictionaries, in the same order as ``analyzed_videos``
+        """
+        try:
+            cfg = self._cfgs[platform]
+            max_len, hlimit, vmax_dur, vmax_sz = (
+                cfg['max_length'], cfg['hashtag_limit'],
+                cfg['video_max_duration'], cfg['video_max_size']
             )
             
-            platform_content = {
-                'text': generated_text,
-                'hashtags': hashtags,
-                'media': media_info,
-                'original_id': video_data['id'],
-                'platform': platform,
-                'engagement_score': analysis.get('engagement_score', 0),
-                'topics': analysis.get('topics', []),
-                'sentiment': analysis.get('sentiment', 'neutral')
-            }
+            prompts = [self._build_prompt(video_data, analysis, platform) for video_data, analysis in analyzed_videos]
+            
+            # Only send cache misses to the LLM
+            generated_texts = [self.llm_cache.get(platform, prompt) for prompt in prompts]
+            misses = [i for i, text in enumerate(generated_texts) if text is None]
+            if misses:
+                fresh_texts = await self.text_generator.generate_text_batch(
+                    [prompts[i] for i in misses],
+                    max_length=max_len,
+                    prefix=self._prompt_prefixes[platform]
+                )
+                for i, (text, is_fallback) in zip(misses, fresh_texts):
+                    generated_texts[i] = text
+                    if not is_fallback:
+                        self.llm_cache.set(platform, prompts[i], text)
+            
+            platform_contents = []
+            for (video_data, analysis), generated_text in zip(analyzed_videos, generated_texts):
+                media_info = await self._prepare_media_for_platform(video_data, vmax_dur, vmax_sz)
+                platform_contents.append(self._build_platform_content(
+                    video_data, analysis, platform, generated_text, media_info, hlimit
+                ))
             
-            return platform_content
+            return platform_contents
             
         except Exception as e:
             logger.error(f"Error transforming for {platform}: {str(e)}")
-            return {}
+            return [{} for _ in analyzed_videos]
+    
+    def _build_prompt(self, video_data: VideoData, analysis: Dict, platform: str) -> str:
+        """Fill the platform prompt template for a video"""
+        return self._prompts[platform](video_data.caption, analysis.get('description', ''))
+    
+    def _build_platform_content(self, video_data: VideoData, analysis: Dict, platform: str,
+                                generated_text: str, media_info: Dict, hashtag_limit: int) -> Dict:
+        """Assemble the platform content dictionary from generated text and analysis"""
+        # Extract hashtags and mentions
+        hashtags = self._extract_hashtags(
+            generated_text, 
+            video_data.hashtags,
+            hashtag_limit
+        )
+        
+        return {
+            'text': generated_text,
+            'hashtags': hashtags,
+            'media': media_info,
+            'original_id': video_data.id,
+            'platform': platform,
+            'engagement_score': analysis.get('engagement_score', 0),
+            'topics': analysis.get('topics', []),
+            'sentiment': analysis.get('sentiment', 'neutral')
+        }
     
     def _extract_hashtags(self, text: str, original_hashtags: List[str], limit: int) -> List[str]:
         """
@@ -130,49 +249,49 @@ class ContentTransformerAgent:
         Returns:
             List of optimized hashtags
         """
-        # Extract hashtags from generated text
-        import re
-        text_hashtags = re.findall(r'#\w+', text)
-        
-        # Combine with original hashtags
-        all_hashtags = list(set(text_hashtags + [f"#{tag}" for tag in original_hashtags if not tag.startswith('#')]))
+        # Combine generated and original hashtags, de-duplicated in first-seen order
+        all_hashtags = dict.fromkeys(chain(
+            _scan_hashtags(text),
+            (tag if tag.startswith('#') else f"#{tag}" for tag in original_hashtags)
+        ))
         
         # Limit to platform maximum
-        return all_hashtags[:limit]
+        return list(islice(all_hashtags, limit))
     
-    async def _prepare_media_for_platform(self, video_data: Dict, platform_config: Dict) -> Dict:
+    async def _prepare_media_for_platform(self, video_data: VideoData, video_max_duration: float, video_max_size: int) -> Dict:
         """
         Prepare media content for the platform
         
         Args:
             video_data: Original video data
-            platform_config: Platform-specific configuration
+            video_max_duration: Platform video duration limit in seconds
+            video_max_size: Platform video size limit in bytes
             
         Returns:
             Media information dictionary
         """
         try:
-            video_info = video_data.get('video_info', {})
+            video_info = video_data.video_info or {}
             
             # Check if video meets platform requirements
             duration = video_info.get('duration', 0)
             file_size = video_info.get('file_size', 0)
             
-            if (duration <= platform_config['video_max_duration'] and 
-                file_size <= platform_config['video_max_size']):
+            if (duration <= video_max_duration and 
+                file_size <= video_max_size):
                 
                 return {
                     'type': 'video',
-                    'path': video_data['video_path'],
+                    'path': video_data.video_path,
                     'duration': duration,
                     'size': file_size,
-                    'thumbnail': video_data.get('thumbnail_url')
+                    'thumbnail': video_data.thumbnail_url
                 }
             else:
                 # Use thumbnail if video doesn't meet requirements
                 return {
                     'type': 'image',
-                    'path': video_data.get('thumbnail_url'),
+                    'path': video_data.thumbnail_url,
                     'note': 'Video too large/long for platform, using thumbnail'
                 }
                 
@@ -180,7 +299,7 @@ class ContentTransformerAgent:
             logger.error(f"Error preparing media: {str(e)}")
             return {}
     
-    def create_transformation_task(self, video_data_list: List[Dict], platforms: List[str]) -> Task:
+    def create_transformation_task(self, video_data_list: List[VideoData], platforms: List[str]) -> Task:
         """
         Create a CrewAI task for content transformation
         
@@ -209,7 +328,7 @@ class ContentTransformerAgent:
             expected_output="Dictionary of transformed content for each platform and video"
         )
     
-    async def execute_transformation(self, video_data_list: List[Dict], platforms: List[str]) -> List[Dict]:
+    async def execute_transformation(self, video_data_list: List[VideoData], platforms: List[str]) -> List[Dict]:
         """
         Execute content transformation for multiple videos
         
@@ -221,14 +340,79 @@ class ContentTransformerAgent:
             List of transformed content for all videos and platforms
         """
         transformed_results = []
+        target_platforms = [platform for platform in platforms if platform in self._cfgs]
+        
+        # Analyze videos concurrently, bounded to avoid flooding the analysis backends
+        semaphore = asyncio.Semaphore(settings.max_concurrency)
         
-        for video_data in video_data_list:
-            transformed_content = await self.transform_content(video_data, platforms)
+        async def _analyze_one(video_data: VideoData) -> Dict:
+            async with semaphore:
+                return await self.content_analyzer.analyze_video_content(
+                    video_data.video_path,
+                    video_data.caption
+                )
+        
+        analyses = await asyncio.gather(
+            *[_analyze_one(video_data) for video_data in video_data_list],
+            return_exceptions=True
+        )
+        
+        analyzed_videos = []
+        for video_data, analysis in zip(video_data_list, analyses):
+            if isinstance(analysis, Exception):
+                logger.error(f"Error transforming content {video_data.id}: {str(analysis)}")
+                continue
+            analyzed_videos.append((video_data, analysis))
+        
+        # One batched generation per platform, so prompts sharing a template prefix go out together
+        platform_batches = await asyncio.gather(
+            *[self._transform_platform_batch(analyzed_videos, platform) for platform in target_platforms]
+        )
+        
+        for index, (video_data, _) in enumerate(analyzed_videos):
+            transformed_content = {
+                platform: batch[index]
+                for platform, batch in zip(target_platforms, platform_batches)
+            }
             if transformed_content:
                 transformed_results.append({
-                    'original_video': video_data,
+                    'original_video': asdict(video_data),
                     'transformed_content': transformed_content
                 })
         
-        logger.info(f"Successfully transformed {len(transformed_results)} videos for {len(platforms)} platforms")
+        logger.info("Successfully transformed {} videos for {} platforms", len(transformed_results), len(platforms))
+        return transformed_results
+    
+    async def stream_transformation(self, queue: asyncio.Queue, platforms: List[str]) -> List[Dict]:
+        """
+        Transform batches of videos as they arrive on a queue
+        
+        Args:
+            queue: Queue of video data lists, terminated by None
+            platforms: Target platforms
+            
+        Returns:
+            List of transformed content for all received videos
+        """
+        transformed_results = []
+        done = False
+        
+        while not done:
+            batch = await queue.get()
+            if batch is None:
+                break
+            
+            # Coalesce whatever else is already waiting into one transformation call
+            while not queue.empty():
+                more = queue.get_nowait()
+                if more is None:
+                    done = True
+                    break
+                batch = batch + more
+            
+            try:
+                transformed_results.extend(await self.execute_transformation(batch, platforms))
+            except Exception as e:
+                logger.error(f"Error transforming streamed batch: {str(e)}")
+        
         return transformed_results
@@ -2,22 +2,44 @@
 Instagram Agent - Responsible for extracting content from Instagram
 """
 import asyncio
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, List, Dict, Optional
 from crewai import Agent, Task
 from loguru import logger
 from services.instagram_scraper import InstagramScraper
 from utils.video_processor import VideoProcessor
 from config import settings
 
+@dataclass(slots=True)
+class VideoData:
+    """Processed Instagram video ready for transformation"""
+    id: str
+    username: str
+    caption: str
+    hashtags: List[str]
+    likes: int
+    comments: int
+    timestamp: Any
+    video_url: str
+    video_path: str
+    video_info: Dict
+    thumbnail_url: Optional[str] = None
+    location: Optional[str] = None
+    mentions: List[str] = field(default_factory=list)
+
 class InstagramAgent:
     """Agent responsible for Instagram content extraction and processing"""
     
     def __init__(self):
         self.scraper = InstagramScraper()
         self.video_processor = VideoProcessor()
-        
-        # Define the CrewAI agent
-        self.agent = Agent(
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _get_agent(cls) -> Agent:
+        """Build the CrewAI agent once per process"""
+        return Agent(
             role="Instagram Content Extractor",
             goal="Extract and analyze Instagram videos from target users",
             backstory="""You are an expert at extracting content from Instagram.
@@ -27,7 +49,12 @@ class InstagramAgent:
             allow_delegation=False
         )
     
-    async def extract_user_content(self, username: str, max_videos: int = 5) -> List[Dict]:
+    @property
+    def agent(self) -> Agent:
+        """Shared CrewAI agent definition"""
+        return type(self)._get_agent()
+    
+    async def extract_user_content(self, username: str, max_videos: int = 5) -> List[VideoData]:
         """
         Extract recent videos from a specific Instagram user
         
@@ -36,65 +63,96 @@ class InstagramAgent:
             max_videos: Maximum number of videos to extract
             
         Returns:
-            List of video data dictionaries
+            List of processed videos
         """
         try:
-            logger.info(f"Extracting content from Instagram user: {username}")
+            logger.info("Extracting content from Instagram user: {}", username)
             
             # Get user's recent posts
             posts = await self.scraper.get_user_posts(username, max_videos)
             
-            video_data = []
-            for post in posts:
-                if post.get('is_video', False):
-                    # Process video
-                    processed_video = await self._process_video_post(post)
-                    if processed_video:
-                        video_data.append(processed_video)
+            video_posts = [post for post in posts if post.get('is_video', False)]
+            
+            # Pipeline downloads and analysis: the next video downloads while the previous one is analyzed
+            download_queue = asyncio.Queue(maxsize=2)
+            
+            async def _download_videos():
+                try:
+                    for post in video_posts:
+                        video_path = await self._download_video_post(post)
+                        await download_queue.put((post, video_path))
+                finally:
+                    await download_queue.put(None)
             
-            logger.info(f"Successfully extracted {len(video_data)} videos from {username}")
+            async def _analyze_videos() -> List[VideoData]:
+                processed_videos = []
+                while True:
+                    item = await download_queue.get()
+                    if item is None:
+                        return processed_videos
+                    post, video_path = item
+                    if video_path:
+                        processed_video = await self._process_video_post(post, video_path)
+                        if processed_video:
+                            processed_videos.append(processed_video)
+            
+            _, video_data = await asyncio.gather(_download_videos(), _analyze_videos())
+            
+            logger.info("Successfully extracted {} videos from {}", len(video_data), username)
             return video_data
             
         except Exception as e:
             logger.error(f"Error extracting content from {username}: {str(e)}")
             return []
     
-    async def _process_video_post(self, post: Dict) -> Optional[Dict]:
+    async def _download_video_post(self, post: Dict) -> Optional[str]:
         """
-        Process a single video post
+        Download the video of a single post
         
         Args:
             post: Raw post data from Instagram
             
         Returns:
-            Processed video data or None if processing fails
+            Local video path or None if the download fails
         """
         try:
-            # Download video
-            video_path = await self.scraper.download_video(post['video_url'], post['shortcode'])
+            return await self.scraper.download_video(post['video_url'], post['shortcode'])
             
-            if not video_path:
-                return None
+        except Exception as e:
+            logger.error(f"Error downloading video post {post.get('shortcode', 'unknown')}: {str(e)}")
+            return None
+    
+    async def _process_video_post(self, post: Dict, video_path: str) -> Optional[VideoData]:
+        """
+        Process a single downloaded video post
+        
+        Args:
+            post: Raw post data from Instagram
+            video_path: Local path of the downloaded video
             
+        Returns:
+            Processed video data or None if processing fails
+        """
+        try:
             # Extract video metadata
             video_info = await self.video_processor.analyze_video(video_path)
             
             # Prepare structured data
-            processed_data = {
-                'id': post['shortcode'],
-                'username': post['username'],
-                'caption': post.get('caption', ''),
-                'hashtags': post.get('hashtags', []),
-                'likes': post.get('likes', 0),
-                'comments': post.get('comments', 0),
-                'timestamp': post.get('timestamp'),
-                'video_url': post['video_url'],
-                'video_path': video_path,
-                'video_info': video_info,
-                'thumbnail_url': post.get('thumbnail_url'),
-                'location': post.get('location'),
-                'mentions': post.get('mentions', [])
-            }
+            processed_data = VideoData(
+                id=post['shortcode'],
+                username=post['username'],
+                caption=post.get('caption', ''),
+                hashtags=[tag if tag.startswith('#') else f"#{tag}" for tag in post.get('hashtags', [])],
+                likes=post.get('likes', 0),
+                comments=post.get('comments', 0),
+                timestamp=post.get('timestamp'),
+                video_url=post['video_url'],
+                video_path=video_path,
+                video_info=video_info,
+                thumbnail_url=post.get('thumbnail_url'),
+                location=post.get('location'),
+                mentions=post.get('mentions', [])
+            )
             
             return processed_data
             
@@ -128,21 +186,41 @@ class InstagramAgent:
             expected_output="List of structured video data with metadata and analysis"
         )
     
-    async def execute_extraction(self, usernames: List[str]) -> List[Dict]:
+    async def execute_extraction(self, 
+                                 usernames: List[str], 
+                                 queue: Optional[asyncio.Queue] = None) -> List[VideoData]:
         """
         Execute content extraction for multiple users
         
         Args:
             usernames: List of Instagram usernames
+            queue: Optional queue that receives each user's videos as soon as they are extracted
             
         Returns:
-            Combined list of all extracted video data
+            Combined list of all extracted videos
         """
         all_content = []
         
-        for username in usernames:
-            user_content = await self.extract_user_content(username, settings.max_videos_per_user)
+        # Extract users concurrently, bounded to respect Instagram rate limits
+        semaphore = asyncio.Semaphore(settings.instagram_concurrency)
+        
+        async def _extract_one(username: str) -> List[VideoData]:
+            async with semaphore:
+                user_content = await self.extract_user_content(username, settings.max_videos_per_user)
+            if queue is not None and user_content:
+                await queue.put(user_content)
+            return user_content
+        
+        results = await asyncio.gather(
+            *[_extract_one(username) for username in usernames],
+            return_exceptions=True
+        )
+        
+        for username, user_content in zip(usernames, results):
+            if isinstance(user_content, Exception):
+                logger.error(f"Error extracting content from {username}: {str(user_content)}")
+                continue
             all_content.extend(user_content)
         
-        logger.info(f"Total content extracted: {len(all_content)} videos from {len(usernames)} users")
+        logger.info("Total content extracted: {} videos from {} users", len(all_content), len(usernames))
         return all_content
@@ -2,20 +2,52 @@
 LinkedIn Agent - Responsible for posting content to LinkedIn
 """
 import asyncio
+from functools import lru_cache
 from typing import Dict, List, Optional
+from aiolimiter import AsyncLimiter
 from crewai import Agent, Task
 from loguru import logger
 from services.social_media_poster import LinkedInPoster
-from config import settings
+from utils.posting_schedule import load_bucket_ranking
+from config import settings, PLATFORM_CONFIGS
+
+# LinkedIn limits, resolved once at import
+MAX_TEXT_LENGTH = PLATFORM_CONFIGS['linkedin']['max_length']
+MAX_VIDEO_DURATION = PLATFORM_CONFIGS['linkedin']['video_max_duration']  # 10 minutes
+
+# LinkedIn posting task description; only the content count varies
+POSTING_TASK_TEMPLATE = """
+            Post {count} pieces of professional content to LinkedIn.
+            
+            For each piece of content:
+            1. Validate the content meets LinkedIn requirements
+            2. Ensure professional tone and value proposition
+            3. Optimize for LinkedIn's algorithm and engagement
+            4. Post with appropriate media and hashtags
+            5. Monitor initial professional engagement
+            6. Log results for business analysis
+            
+            Focus on building thought leadership and professional brand awareness.
+            """
+
+@lru_cache(maxsize=8)
+def _posting_task_description(count: int) -> str:
+    """Format the posting task description for a number of content items"""
+    return POSTING_TASK_TEMPLATE.format(count=count)
 
 class LinkedInAgent:
     """Agent responsible for posting content to LinkedIn"""
     
     def __init__(self):
         self.linkedin_poster = LinkedInPoster()
-        
-        # Define the CrewAI agent
-        self.agent = Agent(
+        self.bucket_ranking = load_bucket_ranking('linkedin')
+        self.rate_limiter = AsyncLimiter(settings.linkedin_posts_per_minute, 60)
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _get_agent(cls) -> Agent:
+        """Build the CrewAI agent once per process"""
+        return Agent(
             role="LinkedIn Content Publisher",
             goal="Publish professional, engaging content to LinkedIn that drives business value",
             backstory="""You are a professional content strategist specializing in LinkedIn.
@@ -26,6 +58,11 @@ class LinkedInAgent:
             allow_delegation=False
         )
     
+    @property
+    def agent(self) -> Agent:
+        """Shared CrewAI agent definition"""
+        return type(self)._get_agent()
+    
     async def post_content(self, content_data: Dict) -> Dict:
         """
         Post content to LinkedIn
@@ -37,7 +74,7 @@ class LinkedInAgent:
             Dictionary with posting results
         """
         try:
-            logger.info(f"Posting content to LinkedIn: {content_data.get('original_id', 'unknown')}")
+            logger.info("Posting content to LinkedIn: {}", content_data.get('original_id', 'unknown'))
             
             # Validate content
             if not self._validate_content(content_data):
@@ -50,17 +87,18 @@ class LinkedInAgent:
             result = await self.linkedin_poster.create_post(post_data)
             
             if result.get('success'):
-                logger.info(f"Successfully posted to LinkedIn: {result.get('post_id')}")
+                logger.info("Successfully posted to LinkedIn: {}", result.get('post_id'))
                 return {
                     'success': True,
                     'post_id': result.get('post_id'),
                     'post_url': result.get('post_url'),
                     'platform': 'linkedin',
-                    'original_id': content_data.get('original_id')
+                    'original_id': content_data.get('original_id'),
+                    'retry_after': result.get('retry_after', 0)
                 }
             else:
                 logger.error(f"Failed to post to LinkedIn: {result.get('error')}")
-                return {'success': False, 'error': result.get('error')}
+                return {'success': False, 'error': result.get('error'), 'retry_after': result.get('retry_after', 0)}
                 
         except Exception as e:
             logger.error(f"Error posting to LinkedIn: {str(e)}")
@@ -76,31 +114,24 @@ class LinkedInAgent:
         Returns:
             True if content is valid, False otherwise
         """
-        try:
-            # Check required fields
-            if not content_data.get('text'):
-                logger.error("No text content provided")
-                return False
-            
-            # Check text length
-            text_length = len(content_data['text'])
-            if text_length > 3000:
-                logger.error(f"Text too long: {text_length} characters")
-                return False
-            
-            # Check media if present
-            media = content_data.get('media', {})
-            if media and media.get('type') == 'video':
-                duration = media.get('duration', 0)
-                if duration > 600:  # LinkedIn video limit (10 minutes)
-                    logger.error(f"Video too long: {duration} seconds")
-                    return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error validating content: {str(e)}")
+        # Check required fields
+        text = content_data.get('text')
+        if not text:
+            logger.error("No text content provided")
+            return False
+        
+        # Check text length
+        if len(text) > MAX_TEXT_LENGTH:
+            logger.error(f"Text too long: {len(text)} characters")
+            return False
+        
+        # Check media if present
+        media = content_data.get('media')
+        if media and media.get('type') == 'video' and media.get('duration', 0) > MAX_VIDEO_DURATION:
+            logger.error(f"Video too long: {media.get('duration')} seconds")
             return False
+        
+        return True
     
     def _prepare_post_data(self, content_data: Dict) -> Dict:
         """
@@ -182,19 +213,7 @@ class LinkedInAgent:
             CrewAI Task object
         """
         return Task(
-            description=f"""
-            Post {len(content_list)} pieces of professional content to LinkedIn.
-            
-            For each piece of content:
-            1. Validate the content meets LinkedIn requirements
-            2. Ensure professional tone and value proposition
-            3. Optimize for LinkedIn's algorithm and engagement
-            4. Post with appropriate media and hashtags
-            5. Monitor initial professional engagement
-            6. Log results for business analysis
-            
-            Focus on building thought leadership and professional brand awareness.
-            """,
+            description=_posting_task_description(len(content_list)),
             agent=self.agent,
             expected_output="List of posting results with post IDs and professional engagement metrics"
         )
@@ -209,18 +228,33 @@ class LinkedInAgent:
         Returns:
             List of posting results
         """
-        results = []
+        # Cleared while backing off after LinkedIn asks us to slow down
+        resume = asyncio.Event()
+        resume.set()
         
-        for content_data in content_list:
-            # Add delay between posts to avoid rate limiting
-            if results:
-                await asyncio.sleep(60)  # 1 minute delay for LinkedIn
+        # Post concurrently, capped by the per-minute token bucket
+        async def _post_one(content_data: Dict) -> Dict:
+            async with self.rate_limiter:
+                # Check after the token is granted so posts queued on the limiter also honor a pause
+                await resume.wait()
+                result = await self.post_content(content_data)
             
-            result = await self.post_content(content_data)
-            results.append(result)
+            # The post that hit the rate limit pauses everyone else, without holding up result collection
+            retry_after = float(result.get('retry_after') or 0)
+            if retry_after > 0 and resume.is_set():
+                logger.warning("LinkedIn rate limit hit, pausing posting for {}s", retry_after)
+                resume.clear()
+                await asyncio.sleep(retry_after)
+                resume.set()
+            return result
         
-        successful_posts = len([r for r in results if r.get('success')])
-        logger.info(f"LinkedIn posting complete: {successful_posts}/{len(content_list)} successful")
+        results = await asyncio.gather(*(_post_one(content_data) for content_data in content_list))
+        
+        logger.opt(lazy=True).info(
+            "LinkedIn posting complete: {}/{} successful",
+            lambda: sum(1 for r in results if r.get('success')),
+            lambda: len(content_list)
+        )
         
         return results
     
@@ -2,29 +2,51 @@
 Orchestrator Agent - Main coordination agent for the Instagram-to-Social Media system
 """
 import asyncio
-from typing import List, Dict, Optional
+import time
+from collections import defaultdict
+from typing import AsyncIterator, List, Dict, Optional, Sequence, Tuple
+from dataclasses import asdict
+from functools import cached_property, lru_cache
 from datetime import datetime, timedelta
 from crewai import Agent, Task, Crew
 from loguru import logger
 
-from .instagram_agent import InstagramAgent
+from .instagram_agent import InstagramAgent, VideoData
 from .content_transformer_agent import ContentTransformerAgent
 from .twitter_agent import TwitterAgent
 from .linkedin_agent import LinkedInAgent
+from utils.posting_schedule import ranked_schedule
 from config import settings
 
 class OrchestratorAgent:
     """Main orchestrator agent that coordinates the entire workflow"""
     
-    def __init__(self):
-        # Initialize all agents
-        self.instagram_agent = InstagramAgent()
-        self.content_transformer = ContentTransformerAgent()
-        self.twitter_agent = TwitterAgent()
-        self.linkedin_agent = LinkedInAgent()
-        
-        # Define the orchestrator agent
-        self.agent = Agent(
+    # Sub-agents open API clients, so each one is only built on first use
+    @cached_property
+    def instagram_agent(self) -> InstagramAgent:
+        """Instagram extraction agent"""
+        return InstagramAgent()
+    
+    @cached_property
+    def content_transformer(self) -> ContentTransformerAgent:
+        """Content transformation agent"""
+        return ContentTransformerAgent()
+    
+    @cached_property
+    def twitter_agent(self) -> TwitterAgent:
+        """Twitter posting agent"""
+        return TwitterAgent()
+    
+    @cached_property
+    def linkedin_agent(self) -> LinkedInAgent:
+        """LinkedIn posting agent"""
+        return LinkedInAgent()
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _get_agent(cls) -> Agent:
+        """Build the orchestrator CrewAI agent once per process"""
+        return Agent(
             role="Content Workflow Orchestrator",
             goal="Coordinate the entire Instagram-to-Social Media transformation workflow",
             backstory="""You are the master coordinator of a sophisticated content 
@@ -36,9 +58,14 @@ class OrchestratorAgent:
             allow_delegation=True
         )
     
+    @property
+    def agent(self) -> Agent:
+        """Shared CrewAI agent definition"""
+        return type(self)._get_agent()
+    
     async def execute_full_workflow(self, 
                                   target_users: List[str], 
-                                  platforms: List[str] = ['twitter', 'linkedin'],
+                                  platforms: Sequence[str] = ('twitter', 'linkedin'),
                                   schedule_posts: bool = False) -> Dict:
         """
         Execute the complete workflow from Instagram extraction to social media posting
@@ -51,26 +78,53 @@ class OrchestratorAgent:
         Returns:
             Complete workflow results
         """
+        # Read the wall clock once; the end time is derived from the monotonic clock
+        start_time = datetime.now()
+        start_clock = time.monotonic()
+        
+        # Freeze and de-duplicate the platforms, keeping their order
+        platforms = tuple(dict.fromkeys(platforms))
+        
         try:
             logger.info(f"Starting full workflow for users: {target_users}, platforms: {platforms}")
             
             workflow_results = {
-                'start_time': datetime.now().isoformat(),
+                'start_time': start_time.isoformat(),
                 'target_users': target_users,
-                'platforms': platforms,
+                'platforms': list(platforms),
                 'extraction_results': {},
                 'transformation_results': {},
                 'posting_results': {},
                 'errors': []
             }
             
-            # Step 1: Extract Instagram content
+            if not platforms:
+                logger.warning("No platforms specified, stopping workflow")
+                workflow_results['errors'].append("No platforms specified")
+                return workflow_results
+            
+            # Steps 1 and 2 are pipelined: each user's videos are transformed as soon as they are extracted
             logger.info("Step 1: Extracting Instagram content...")
-            extraction_results = await self.instagram_agent.execute_extraction(target_users)
+            logger.info("Step 2: Transforming content for platforms as it is extracted...")
+            video_queue = asyncio.Queue(maxsize=settings.workflow_batch_size)
+            
+            async def _extract_all() -> List[VideoData]:
+                try:
+                    return await self._run_in_batches(
+                        target_users, settings.workflow_batch_size,
+                        lambda users: self.instagram_agent.execute_extraction(users, video_queue)
+                    )
+                finally:
+                    await video_queue.put(None)
+            
+            extraction_results, transformation_results = await asyncio.gather(
+                _extract_all(),
+                self.content_transformer.stream_transformation(video_queue, platforms)
+            )
             workflow_results['extraction_results'] = {
                 'total_videos': len(extraction_results),
                 'videos_by_user': self._group_by_user(extraction_results),
-                'videos': extraction_results
+                'videos': [asdict(video) for video in extraction_results]
             }
             
             if not extraction_results:
@@ -78,11 +132,6 @@ class OrchestratorAgent:
                 workflow_results['errors'].append("No content extracted from Instagram")
                 return workflow_results
             
-            # Step 2: Transform content for platforms
-            logger.info("Step 2: Transforming content for platforms...")
-            transformation_results = await self.content_transformer.execute_transformation(
-                extraction_results, platforms
-            )
             workflow_results['transformation_results'] = {
                 'total_transformations': len(transformation_results),
                 'transformations': transformation_results
@@ -102,7 +151,7 @@ class OrchestratorAgent:
             
             # Step 4: Generate summary
             workflow_results['summary'] = self._generate_workflow_summary(workflow_results)
-            workflow_results['end_time'] = datetime.now().isoformat()
+            workflow_results['end_time'] = self._end_timestamp(start_time, start_clock)
             
             logger.info("Full workflow completed successfully")
             return workflow_results
@@ -110,12 +159,36 @@ class OrchestratorAgent:
         except Exception as e:
             logger.error(f"Error in full workflow: {str(e)}")
             workflow_results['errors'].append(f"Workflow error: {str(e)}")
-            workflow_results['end_time'] = datetime.now().isoformat()
+            workflow_results['end_time'] = self._end_timestamp(start_time, start_clock)
             return workflow_results
     
+    def _end_timestamp(self, start_time: datetime, start_clock: float) -> str:
+        """ISO timestamp of now, derived from the workflow start and the monotonic clock"""
+        return (start_time + timedelta(seconds=time.monotonic() - start_clock)).isoformat()
+    
+    async def _run_in_batches(self, items: List, batch_size: int, run_batch) -> List:
+        """
+        Run a batch coroutine over fixed-size slices of items, one slice at a time
+        
+        Keeps the number of tasks in flight bounded no matter how many items are passed.
+        
+        Args:
+            items: Items to process
+            batch_size: Maximum items handed to a single call
+            run_batch: Coroutine function taking a list of items and returning a list of results
+            
+        Returns:
+            Concatenated results of all batches
+        """
+        results = []
+        batch_size = max(1, batch_size)
+        for start in range(0, len(items), batch_size):
+            results.extend(await run_batch(items[start:start + batch_size]))
+        return results
+    
     async def _execute_posting(self, 
                              transformation_results: List[Dict], 
-                             platforms: List[str],
+                             platforms: Sequence[str],
                              schedule_posts: bool) -> Dict:
         """
         Execute posting across all platforms
@@ -130,76 +203,117 @@ class OrchestratorAgent:
         """
         posting_results = {}
         
-        for platform in platforms:
-            try:
-                # Extract content for this platform
-                platform_content = []
-                for result in transformation_results:
-                    if platform in result.get('transformed_content', {}):
-                        platform_content.append(result['transformed_content'][platform])
-                
-                if not platform_content:
-                    logger.warning(f"No content available for {platform}")
-                    continue
-                
-                # Post to platform
-                if platform == 'twitter':
-                    if schedule_posts:
-                        # Schedule posts with intervals
-                        results = await self._schedule_twitter_posts(platform_content)
-                    else:
-                        results = await self.twitter_agent.execute_posting(platform_content)
-                    posting_results['twitter'] = results
-                    
-                elif platform == 'linkedin':
-                    if schedule_posts:
-                        # Schedule posts with intervals
-                        results = await self._schedule_linkedin_posts(platform_content)
-                    else:
-                        results = await self.linkedin_agent.execute_posting(platform_content)
-                    posting_results['linkedin'] = results
-                
-            except Exception as e:
-                logger.error(f"Error posting to {platform}: {str(e)}")
-                posting_results[platform] = {'error': str(e)}
+        # Index content by platform in a single pass over the results
+        platform_content = {platform: [] for platform in platforms}
+        for result in transformation_results:
+            for platform, content in result.get('transformed_content', {}).items():
+                if platform in platform_content:
+                    platform_content[platform].append(content)
+        
+        # Platforms are independent, post to all of them concurrently
+        results = await asyncio.gather(
+            *[self._post_one_platform(platform, platform_content[platform], schedule_posts) for platform in platforms],
+            return_exceptions=True
+        )
+        
+        for platform, result in zip(platforms, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error posting to {platform}: {str(result)}")
+                posting_results[platform] = {'error': str(result)}
+            elif result is not None:
+                posting_results[platform] = result
         
         return posting_results
     
+    async def _post_one_platform(self, 
+                                 platform: str, 
+                                 platform_content: List[Dict], 
+                                 schedule_posts: bool) -> Optional[List[Dict]]:
+        """
+        Post or schedule transformed content on a single platform
+        
+        Args:
+            platform: Target platform
+            platform_content: Transformed content for this platform
+            schedule_posts: Whether to schedule or post immediately
+            
+        Returns:
+            Posting results, or None if there was nothing to post
+        """
+        if not platform_content:
+            logger.warning(f"No content available for {platform}")
+            return None
+        
+        # Post to platform
+        if platform == 'twitter':
+            if schedule_posts:
+                # Schedule posts with intervals
+                return await self._schedule_twitter_posts(platform_content)
+            return await self.twitter_agent.execute_posting(platform_content)
+        
+        elif platform == 'linkedin':
+            if schedule_posts:
+                # Schedule posts with intervals
+                return await self._schedule_linkedin_posts(platform_content)
+            return await self.linkedin_agent.execute_posting(platform_content)
+        
+        return None
+    
     async def _schedule_twitter_posts(self, content_list: List[Dict]) -> List[Dict]:
         """Schedule Twitter posts with optimal timing"""
-        results = []
         base_time = datetime.now() + timedelta(hours=1)  # Start in 1 hour
         
-        for i, content in enumerate(content_list):
+        if self.twitter_agent.bucket_ranking:
+            # Best-ranked time slots first
+            schedule_times = ranked_schedule(self.twitter_agent.bucket_ranking, len(content_list), base_time)
+        else:
             # Schedule posts 30 minutes apart
-            schedule_time = base_time + timedelta(minutes=30 * i)
-            result = await self.twitter_agent.schedule_post(content, schedule_time.isoformat())
-            results.append(result)
+            schedule_times = [base_time + timedelta(minutes=30 * i) for i in range(len(content_list))]
         
-        return results
+        return await self._schedule_bounded(self.twitter_agent.schedule_post, content_list, schedule_times)
     
     async def _schedule_linkedin_posts(self, content_list: List[Dict]) -> List[Dict]:
         """Schedule LinkedIn posts with optimal timing"""
-        results = []
         base_time = datetime.now() + timedelta(hours=2)  # Start in 2 hours
         
-        for i, content in enumerate(content_list):
+        if self.linkedin_agent.bucket_ranking:
+            # Best-ranked time slots first
+            schedule_times = ranked_schedule(self.linkedin_agent.bucket_ranking, len(content_list), base_time)
+        else:
             # Schedule posts 2 hours apart for LinkedIn
-            schedule_time = base_time + timedelta(hours=2 * i)
-            result = await self.linkedin_agent.schedule_post(content, schedule_time.isoformat())
-            results.append(result)
+            schedule_times = [base_time + timedelta(hours=2 * i) for i in range(len(content_list))]
         
-        return results
+        return await self._schedule_bounded(self.linkedin_agent.schedule_post, content_list, schedule_times)
+    
+    async def _schedule_bounded(self, schedule_post, content_list: List[Dict], schedule_times: List[datetime]) -> List[Dict]:
+        """
+        Send scheduling requests concurrently, at most settings.schedule_concurrency at a time
+        
+        Args:
+            schedule_post: Agent coroutine function taking content and an ISO schedule time
+            content_list: Content to schedule
+            schedule_times: Posting time for each content item
+            
+        Returns:
+            Scheduling results in the order of content_list
+        """
+        semaphore = asyncio.BoundedSemaphore(max(1, settings.schedule_concurrency))
+        
+        async def schedule_one(content: Dict, schedule_time: datetime) -> Dict:
+            async with semaphore:
+                return await schedule_post(content, schedule_time.isoformat())
+        
+        return await asyncio.gather(*[
+            schedule_one(content, schedule_time)
+            for content, schedule_time in zip(content_list, schedule_times)
+        ])
     
-    def _group_by_user(self, extraction_results: List[Dict]) -> Dict:
+    def _group_by_user(self, extraction_results: List[VideoData]) -> Dict:
         """Group extraction results by Instagram user"""
-        grouped = {}
+        grouped = defaultdict(list)
         for video in extraction_results:
-            username = video.get('username', 'unknown')
-            if username not in grouped:
-                grouped[username] = []
-            grouped[username].append(video['id'])
-        return grouped
+            grouped[video.username or 'unknown'].append(video.id)
+        return dict(grouped)
     
     def _generate_workflow_summary(self, workflow_results: Dict) -> Dict:
         """Generate a summary of the workflow execution"""
@@ -215,7 +329,7 @@ class OrchestratorAgent:
         # Calculate posting success rates
         for platform, results in workflow_results['posting_results'].items():
             if isinstance(results, list):
-                successful = len([r for r in results if r.get('success')])
+                successful = sum(1 for r in results if r.get('success'))
                 total = len(results)
                 summary['posting_summary'][platform] = {
                     'successful': successful,
@@ -281,24 +395,59 @@ class OrchestratorAgent:
             Engagement metrics
         """
         try:
-            engagement_data = {}
-            
-            # Get Twitter engagement
-            twitter_results = workflow_results.get('posting_results', {}).get('twitter', [])
-            twitter_ids = [r.get('tweet_id') for r in twitter_results if r.get('success')]
-            if twitter_ids:
-                twitter_metrics = await self.twitter_agent.get_engagement_metrics(twitter_ids)
-                engagement_data['twitter'] = twitter_metrics
-            
-            # Get LinkedIn engagement
-            linkedin_results = workflow_results.get('posting_results', {}).get('linkedin', [])
-            linkedin_ids = [r.get('post_id') for r in linkedin_results if r.get('success')]
-            if linkedin_ids:
-                linkedin_metrics = await self.linkedin_agent.get_engagement_metrics(linkedin_ids)
-                engagement_data['linkedin'] = linkedin_metrics
-            
-            return engagement_data
+            return {platform: metrics async for platform, metrics in self.stream_engagement(workflow_results)}
             
         except Exception as e:
             logger.error(f"Error monitoring engagement: {str(e)}")
             return {}
+    
+    async def stream_engagement(self, workflow_results: Dict) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Fetch engagement metrics for all platforms concurrently, yielding each as soon as it arrives
+        
+        Args:
+            workflow_results: Results from workflow execution
+            
+        Yields:
+            (platform, metrics) tuples in completion order
+        """
+        posting_results = workflow_results.get('posting_results', {})
+        metric_requests = {}
+        
+        # Get Twitter engagement
+        twitter_results = posting_results.get('twitter', [])
+        twitter_ids = [tweet_id for r in twitter_results if r.get('success') and (tweet_id := r.get('tweet_id'))]
+        if twitter_ids:
+            metric_requests['twitter'] = self.twitter_agent.get_engagement_metrics(twitter_ids)
+        
+        # Get LinkedIn engagement
+        linkedin_results = posting_results.get('linkedin', [])
+        linkedin_ids = [post_id for r in linkedin_results if r.get('success') and (post_id := r.get('post_id'))]
+        if linkedin_ids:
+            metric_requests['linkedin'] = self.linkedin_agent.get_engagement_metrics(linkedin_ids)
+        
+        async def _fetch(platform: str, request) -> Tuple[str, Dict]:
+            return platform, await request
+        
+        for next_done in asyncio.as_completed([_fetch(platform, request) for platform, request in metric_requests.items()]):
+            yield await next_done
+    
+    async def monitor_engagement_stream(self, workflow_results: Dict,
+                                        interval: float = 60, duration: float = 300) -> AsyncIterator[Dict]:
+        """
+        Poll engagement metrics periodically, yielding a snapshot after each interval
+        
+        Args:
+            workflow_results: Results from workflow execution
+            interval: Seconds between snapshots
+            duration: Total seconds to keep polling
+            
+        Yields:
+            Engagement metrics by platform, as returned by monitor_engagement
+        """
+        deadline = time.monotonic() + duration
+        while True:
+            await asyncio.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+            yield await self.monitor_engagement(workflow_results)
+            if time.monotonic() >= deadline:
+                break
@@ -2,20 +2,104 @@
 Twitter Agent - Responsible for posting content to Twitter
 """
 import asyncio
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from aiolimiter import AsyncLimiter
 from crewai import Agent, Task
 from loguru import logger
 from services.social_media_poster import TwitterPoster
-from config import settings
+from utils.posting_schedule import load_bucket_ranking
+from config import settings, PLATFORM_CONFIGS
+
+# Twitter limits, resolved once at import
+MAX_TEXT_LENGTH = PLATFORM_CONFIGS['twitter']['max_length']
+MAX_VIDEO_DURATION = PLATFORM_CONFIGS['twitter']['video_max_duration']
+
+# Twitter API v2 tweet creation window
+RATE_LIMIT_WINDOW = 3 * 60 * 60  # seconds
+
+# Maximum tweet IDs per Twitter API v2 lookup
+METRICS_BATCH_SIZE = 100
+
+# Number of validated/prepared tweets remembered per agent
+PREP_CACHE_SIZE = 4096
+
+# Unpacks the fixed transformer content schema in a single call
+_unpack_tweet_fields = itemgetter(
+    'text', 'hashtags', 'media', 'original_id', 'topics', 'sentiment', 'engagement_score'
+)
+
+# Twitter posting task description; only the content count varies
+POSTING_TASK_TEMPLATE = """
+            Post {count} pieces of content to Twitter.
+            
+            For each piece of content:
+            1. Validate the content meets Twitter requirements
+            2. Optimize posting time for maximum engagement
+            3. Post the content with appropriate media
+            4. Monitor initial engagement
+            5. Log results for analysis
+            
+            Ensure all posts comply with Twitter's terms of service and community guidelines.
+            """
+
+@lru_cache(maxsize=8)
+def _posting_task_description(count: int) -> str:
+    """Format the posting task description for a number of content items"""
+    return POSTING_TASK_TEMPLATE.format(count=count)
+
+@dataclass(slots=True, frozen=True)
+class TweetCandidate:
+    """The fields of transformed content that tweet validation looks at"""
+    text: str
+    media_type: Optional[str]
+    media_duration: float
+    
+    @classmethod
+    def from_content(cls, content_data: Dict) -> "TweetCandidate":
+        """Build a candidate from a transformed content dictionary"""
+        media = content_data.get('media') or {}
+        return cls(
+            text=content_data.get('text') or '',
+            media_type=media.get('type'),
+            media_duration=media.get('duration') or 0
+        )
+    
+    def is_valid(self) -> bool:
+        """True if the text fits in a tweet and any video is within Twitter's duration limit"""
+        return (bool(self.text) and len(self.text) <= MAX_TEXT_LENGTH
+                and (self.media_type != 'video' or self.media_duration <= MAX_VIDEO_DURATION))
 
 class TwitterAgent:
     """Agent responsible for posting content to Twitter"""
     
     def __init__(self):
-        self.twitter_poster = TwitterPoster()
+        # Every agent in the process shares one API client, concurrency bound and rate limit
+        self.twitter_poster, self._semaphore, self.rate_limiter = type(self)._get_shared_clients()
+        self.bucket_ranking = load_bucket_ranking('twitter')
         
-        # Define the CrewAI agent
-        self.agent = Agent(
+        # (original_id, text) -> validation result / prepared tweet data
+        self._validation_cache: "OrderedDict[Tuple, bool]" = OrderedDict()
+        self._prep_cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _get_shared_clients(cls) -> Tuple[TwitterPoster, asyncio.BoundedSemaphore, AsyncLimiter]:
+        """Build the Twitter poster, concurrency bound and rate limiter once per process"""
+        return (
+            TwitterPoster(),
+            asyncio.BoundedSemaphore(settings.twitter_max_concurrent),
+            AsyncLimiter(settings.twitter_posts_per_window, RATE_LIMIT_WINDOW)
+        )
+    
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _get_agent(cls) -> Agent:
+        """Build the CrewAI agent once per process"""
+        return Agent(
             role="Twitter Content Publisher",
             goal="Publish optimized content to Twitter with maximum engagement potential",
             backstory="""You are a social media expert specializing in Twitter engagement.
@@ -26,6 +110,11 @@ class TwitterAgent:
             allow_delegation=False
         )
     
+    @property
+    def agent(self) -> Agent:
+        """Shared CrewAI agent definition"""
+        return type(self)._get_agent()
+    
     async def post_content(self, content_data: Dict) -> Dict:
         """
         Post content to Twitter
@@ -37,7 +126,7 @@ class TwitterAgent:
             Dictionary with posting results
         """
         try:
-            logger.info(f"Posting content to Twitter: {content_data.get('original_id', 'unknown')}")
+            logger.info("Posting content to Twitter: {}", content_data.get('original_id', 'unknown'))
             
             # Validate content
             if not self._validate_content(content_data):
@@ -50,7 +139,7 @@ class TwitterAgent:
             result = await self.twitter_poster.post_tweet(tweet_data)
             
             if result.get('success'):
-                logger.info(f"Successfully posted to Twitter: {result.get('tweet_id')}")
+                logger.info("Successfully posted to Twitter: {}", result.get('tweet_id'))
                 return {
                     'success': True,
                     'tweet_id': result.get('tweet_id'),
@@ -66,9 +155,21 @@ class TwitterAgent:
             logger.error(f"Error posting to Twitter: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def _content_key(self, content_data: Dict) -> Tuple:
+        """Identify a piece of content for memoization"""
+        return (content_data.get('original_id'), content_data.get('text'))
+    
+    def _remember(self, cache: OrderedDict, key: Tuple, value):
+        """Store a value in a bounded LRU cache"""
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > PREP_CACHE_SIZE:
+            cache.popitem(last=False)
+        return value
+    
     def _validate_content(self, content_data: Dict) -> bool:
         """
-        Validate content before posting
+        Validate content before posting, memoized per content
         
         Args:
             content_data: Content data to validate
@@ -76,35 +177,27 @@ class TwitterAgent:
         Returns:
             True if content is valid, False otherwise
         """
-        try:
-            # Check required fields
-            if not content_data.get('text'):
-                logger.error("No text content provided")
-                return False
-            
-            # Check text length
-            text_length = len(content_data['text'])
-            if text_length > 280:
-                logger.error(f"Text too long: {text_length} characters")
-                return False
-            
-            # Check media if present
-            media = content_data.get('media', {})
-            if media and media.get('type') == 'video':
-                duration = media.get('duration', 0)
-                if duration > 140:  # Twitter video limit
-                    logger.error(f"Video too long: {duration} seconds")
-                    return False
-            
+        key = self._content_key(content_data)
+        if key in self._validation_cache:
+            self._validation_cache.move_to_end(key)
+            return self._validation_cache[key]
+        return self._remember(self._validation_cache, key, self._check_content(content_data))
+    
+    def _check_content(self, content_data: Dict) -> bool:
+        """Run the (uncached) content validation checks"""
+        candidate = TweetCandidate.from_content(content_data)
+        if candidate.is_valid():
             return True
-            
-        except Exception as e:
-            logger.error(f"Error validating content: {str(e)}")
-            return False
+        
+        logger.error(
+            "Invalid tweet content: {} characters, {} media of {} seconds",
+            len(candidate.text), candidate.media_type or 'no', candidate.media_duration
+        )
+        return False
     
     def _prepare_tweet_data(self, content_data: Dict) -> Dict:
         """
-        Prepare tweet data for posting
+        Prepare tweet data for posting, memoized per content
         
         Args:
             content_data: Transformed content data
@@ -112,13 +205,31 @@ class TwitterAgent:
         Returns:
             Tweet data dictionary
         """
+        key = self._content_key(content_data)
+        if key in self._prep_cache:
+            self._prep_cache.move_to_end(key)
+            return self._prep_cache[key]
+        return self._remember(self._prep_cache, key, self._build_tweet_data(content_data))
+    
+    def _build_tweet_data(self, content_data: Dict) -> Dict:
+        """Assemble the (uncached) tweet payload"""
+        try:
+            text, hashtags, media, original_id, topics, sentiment, engagement_score = \
+                _unpack_tweet_fields(content_data)
+        except KeyError:
+            # Content not built by the transformer may omit the optional fields
+            text, hashtags, media, original_id, topics, sentiment, engagement_score = \
+                _unpack_tweet_fields({
+                    'hashtags': [], 'media': {}, 'original_id': None, 'topics': [],
+                    'sentiment': 'neutral', 'engagement_score': 0, **content_data
+                })
+        
         tweet_data = {
-            'text': content_data['text'],
-            'hashtags': content_data.get('hashtags', []),
+            'text': text,
+            'hashtags': hashtags,
         }
         
         # Add media if present
-        media = content_data.get('media', {})
         if media:
             tweet_data['media'] = {
                 'type': media.get('type'),
@@ -127,10 +238,10 @@ class TwitterAgent:
         
         # Add metadata
         tweet_data['metadata'] = {
-            'original_id': content_data.get('original_id'),
-            'topics': content_data.get('topics', []),
-            'sentiment': content_data.get('sentiment', 'neutral'),
-            'engagement_score': content_data.get('engagement_score', 0)
+            'original_id': original_id,
+            'topics': topics,
+            'sentiment': sentiment,
+            'engagement_score': engagement_score
         }
         
         return tweet_data
@@ -176,18 +287,7 @@ class TwitterAgent:
             CrewAI Task object
         """
         return Task(
-            description=f"""
-            Post {len(content_list)} pieces of content to Twitter.
-            
-            For each piece of content:
-            1. Validate the content meets Twitter requirements
-            2. Optimize posting time for maximum engagement
-            3. Post the content with appropriate media
-            4. Monitor initial engagement
-            5. Log results for analysis
-            
-            Ensure all posts comply with Twitter's terms of service and community guidelines.
-            """,
+            description=_posting_task_description(len(content_list)),
             agent=self.agent,
             expected_output="List of posting results with tweet IDs and engagement metrics"
         )
@@ -202,21 +302,23 @@ class TwitterAgent:
         Returns:
             List of posting results
         """
-        results = []
+        # Post concurrently; only wait when the rate limit budget is used up
+        results = await asyncio.gather(*[self._post_with_limit(content_data) for content_data in content_list])
         
-        for content_data in content_list:
-            # Add delay between posts to avoid rate limiting
-            if results:
-                await asyncio.sleep(30)  # 30 second delay
-            
-            result = await self.post_content(content_data)
-            results.append(result)
-        
-        successful_posts = len([r for r in results if r.get('success')])
-        logger.info(f"Twitter posting complete: {successful_posts}/{len(content_list)} successful")
+        logger.opt(lazy=True).info(
+            "Twitter posting complete: {}/{} successful",
+            lambda: sum(1 for r in results if r.get('success')),
+            lambda: len(content_list)
+        )
         
         return results
     
+    async def _post_with_limit(self, content_data: Dict) -> Dict:
+        """Post content once a concurrency slot and a rate limit token are available"""
+        async with self._semaphore:
+            async with self.rate_limiter:
+                return await self.post_content(content_data)
+    
     async def get_engagement_metrics(self, tweet_ids: List[str]) -> Dict:
         """
         Get engagement metrics for posted tweets
@@ -228,7 +330,18 @@ class TwitterAgent:
             Dictionary with engagement metrics
         """
         try:
-            metrics = await self.twitter_poster.get_tweet_metrics(tweet_ids)
+            # Fetch each batch of IDs concurrently and merge the results
+            batches = [
+                tweet_ids[i:i + METRICS_BATCH_SIZE]
+                for i in range(0, len(tweet_ids), METRICS_BATCH_SIZE)
+            ]
+            batch_metrics = await asyncio.gather(
+                *[self.twitter_poster.get_tweet_metrics(batch) for batch in batches]
+            )
+            
+            metrics = {}
+            for batch_result in batch_metrics:
+                metrics.update(batch_result)
             return metrics
             
         except Exception as e:
@@ -2,17 +2,49 @@
 Analytics and Monitoring for Instagram-to-Social Media Agent System
 Track performance, success rates, and system metrics
 """
-import json
+import atexit
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
-from dataclasses import dataclass, asdict
+import re
+import threading
+import time
+import heapq
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from operator import attrgetter
+from typing import Dict, List, Optional
+from array import array
+from dataclasses import dataclass, fields
 from loguru import logger
+from json_codec import parse_json, serialize_json
 
-@dataclass
+# Known error families in priority order, matched case-insensitively in one regex pass
+_ERROR_PATTERN = re.compile(
+    r'(?=.*?(?P<rate>rate limit))|(?=.*?(?P<auth>unauthorized))|(?=.*?(?P<perm>forbidden))',
+    re.IGNORECASE | re.DOTALL
+)
+_ERROR_LABELS = {
+    'rate': "Rate limiting",
+    'auth': "Authentication error",
+    'perm': "Permission error",
+}
+
+def _classify_error(error_message: str) -> str:
+    """Simplify an error message to its family, or keep it as-is"""
+    error = error_message or "Unknown error"
+    match = _ERROR_PATTERN.match(error)
+    return _ERROR_LABELS[match.lastgroup] if match else error
+
+# Distinct errors listed in the printed report
+ERROR_REPORT_LIMIT = 10
+
+# Seconds the background writer waits to coalesce tracked posts into one append
+FLUSH_INTERVAL = 2.0
+
+@dataclass(slots=True)
 class PostMetrics:
     """Metrics for a single post"""
-    timestamp: str
+    timestamp: float  # epoch seconds
     instagram_user: str
     instagram_shortcode: str
     instagram_likes: int
@@ -23,6 +55,19 @@ class PostMetrics:
     error_message: str = ""
     content_length: int = 0
     processing_time: float = 0.0
+    
+    def __post_init__(self):
+        # Records written before timestamps were stored as epoch seconds hold ISO strings
+        if isinstance(self.timestamp, str):
+            self.timestamp = datetime.fromisoformat(self.timestamp).timestamp()
+
+# Stored PostMetrics fields, read in one call instead of a recursive asdict() copy
+POST_FIELD_NAMES = tuple(f.name for f in fields(PostMetrics))
+_get_post_fields = attrgetter(*POST_FIELD_NAMES)
+
+def _post_line(post: PostMetrics) -> bytes:
+    """One JSON-Lines record for a post"""
+    return serialize_json(dict(zip(POST_FIELD_NAMES, _get_post_fields(post))), indent=False) + b'\n'
 
 @dataclass
 class SystemMetrics:
@@ -34,43 +79,140 @@ class SystemMetrics:
     avg_processing_time: float = 0.0
     total_instagram_users: int = 0
     total_videos_processed: int = 0
-    last_run: str = ""
+    last_run: float = 0.0  # epoch seconds
 
 class AnalyticsTracker:
     """Track and analyze system performance"""
     
-    def __init__(self, data_file: str = "analytics_data.json"):
+    def __init__(self, data_file: str = "analytics_data.jsonl"):
         self.data_file = data_file
         self.posts: List[PostMetrics] = []
+        self._epochs = array('d')  # post timestamps, kept sorted alongside self.posts
+        
+        # Tracked posts waiting for the background writer
+        self._pending: List[PostMetrics] = []
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        
         self.load_data()
     
     def load_data(self):
-        """Load existing analytics data"""
+        """Load existing analytics data from the append-only log"""
+        legacy_file = os.path.splitext(self.data_file)[0] + '.json'
+        if not os.path.exists(self.data_file) and legacy_file != self.data_file and os.path.exists(legacy_file):
+            self._migrate_legacy_data(legacy_file)
+            return
+        
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.posts = [PostMetrics(**post) for post in data.get('posts', [])]
+                self.posts = []
+                skipped = 0
+                # Read the whole log in one call, then decode it line by line
+                with open(self.data_file, 'rb') as f:
+                    lines = f.read().splitlines()
+                for line_number, line in enumerate(lines, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        self.posts.append(PostMetrics(**parse_json(line)))
+                    except Exception as e:
+                        # A crash mid-append leaves at most one partial line behind
+                        logger.warning(f"⚠️ Skipping unreadable analytics record on line {line_number}: {e}")
+                        skipped += 1
+                self.posts.sort(key=lambda post: post.timestamp)
+                self._epochs = array('d', (post.timestamp for post in self.posts))
                 logger.info(f"📊 Loaded {len(self.posts)} historical posts")
+                
+                # Rewrite the log so new appends don't land on a partial line
+                if skipped:
+                    self.compact()
             except Exception as e:
                 logger.warning(f"⚠️ Could not load analytics data: {e}")
                 self.posts = []
+                self._epochs = array('d')
         else:
             logger.info("📊 Starting fresh analytics tracking")
     
+    def _migrate_legacy_data(self, legacy_file: str):
+        """Import a pre-JSON-Lines analytics file and write it out as a log"""
+        try:
+            with open(legacy_file, 'rb') as f:
+                data = parse_json(f.read())
+            self.posts = sorted(
+                (PostMetrics(**post) for post in data.get('posts', [])),
+                key=lambda post: post.timestamp
+            )
+            self._epochs = array('d', (post.timestamp for post in self.posts))
+            logger.info(f"📊 Migrated {len(self.posts)} historical posts from {legacy_file}")
+            self.compact()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not migrate analytics data: {e}")
+            self.posts = []
+            self._epochs = array('d')
+    
     def save_data(self):
         """Save analytics data to file"""
+        self.compact()
+    
+    def compact(self):
+        """Rewrite the whole log from memory, dropping partial lines and restoring time order"""
         try:
-            data = {
-                'posts': [asdict(post) for post in self.posts],
-                'last_updated': datetime.now().isoformat()
-            }
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"💾 Saved analytics data ({len(self.posts)} posts)")
+            with self._write_lock:
+                # The rewrite includes every pending post, so the writer has nothing left to append
+                with self._pending_lock:
+                    posts = list(self.posts)
+                    self._pending.clear()
+                
+                # Serialize first, then swap the file in with a single write
+                payload = b''.join(_post_line(post) for post in posts)
+                temp_file = self.data_file + '.tmp'
+                with open(temp_file, 'wb') as f:
+                    f.write(payload)
+                os.replace(temp_file, self.data_file)
+            logger.info(f"💾 Saved analytics data ({len(posts)} posts)")
+        except Exception as e:
+            logger.error(f"❌ Could not save analytics data: {e}")
+    
+    def flush(self):
+        """Append all pending posts to the log in a single write"""
+        try:
+            with self._write_lock:
+                with self._pending_lock:
+                    pending, self._pending = self._pending, []
+                    self._dirty.clear()
+                if pending:
+                    with open(self.data_file, 'ab') as f:
+                        f.write(b''.join(_post_line(post) for post in pending))
         except Exception as e:
             logger.error(f"❌ Could not save analytics data: {e}")
     
+    def _record_post(self, post: PostMetrics):
+        """Add a post to the history and queue it for the background writer, starting it on first use"""
+        with self._pending_lock:
+            if self._epochs and post.timestamp < self._epochs[-1]:
+                # Clock went backwards, insert in order to keep the history sorted
+                index = bisect_right(self._epochs, post.timestamp)
+                self.posts.insert(index, post)
+                self._epochs.insert(index, post.timestamp)
+            else:
+                self.posts.append(post)
+                self._epochs.append(post.timestamp)
+            self._pending.append(post)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="analytics-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._dirty.set()
+    
+    def _writer_loop(self):
+        """Flush pending posts shortly after they are tracked, batching bursts together"""
+        while True:
+            self._dirty.wait()
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+    
     def track_post(self, 
                    instagram_user: str,
                    instagram_shortcode: str,
@@ -85,7 +227,7 @@ class AnalyticsTracker:
         """Track a single post"""
         
         post = PostMetrics(
-            timestamp=datetime.now().isoformat(),
+            timestamp=time.time(),
             instagram_user=instagram_user,
             instagram_shortcode=instagram_shortcode,
             instagram_likes=instagram_likes,
@@ -98,46 +240,53 @@ class AnalyticsTracker:
             processing_time=processing_time
         )
         
-        self.posts.append(post)
-        self.save_data()
+        self._record_post(post)
         
         status = "✅ SUCCESS" if success else "❌ FAILED"
         logger.info(f"📊 Tracked post: {instagram_shortcode} → {platform} ({status})")
     
+    def _recent_posts(self, days: int) -> List[PostMetrics]:
+        """Posts from the last N days, located by binary search on the sorted timestamps"""
+        cutoff_epoch = time.time() - days * 86400
+        return self.posts[bisect_right(self._epochs, cutoff_epoch):]
+    
     def get_system_metrics(self, days: int = 30) -> SystemMetrics:
         """Get system metrics for the last N days"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_posts = [
-            post for post in self.posts 
-            if datetime.fromisoformat(post.timestamp) > cutoff_date
-        ]
+        return self._summarize(self._recent_posts(days))
+    
+    def _summarize(self, recent_posts: List[PostMetrics]) -> SystemMetrics:
+        """Get system metrics for a window of posts"""
+        # Accumulate everything in one pass over the window
+        total = successful = 0
+        time_sum = 0.0
+        users = set()
+        last_run = 0.0
+        for post in recent_posts:
+            total += 1
+            successful += post.success
+            time_sum += post.processing_time
+            users.add(post.instagram_user)
+            last_run = post.timestamp
         
-        if not recent_posts:
+        if not total:
             return SystemMetrics()
         
-        successful = [post for post in recent_posts if post.success]
-        failed = [post for post in recent_posts if not post.success]
-        
-        success_rate = (len(successful) / len(recent_posts)) * 100 if recent_posts else 0
-        avg_time = sum(post.processing_time for post in recent_posts) / len(recent_posts)
-        
-        unique_users = len(set(post.instagram_user for post in recent_posts))
-        
         return SystemMetrics(
-            total_posts=len(recent_posts),
-            successful_posts=len(successful),
-            failed_posts=len(failed),
-            success_rate=success_rate,
-            avg_processing_time=avg_time,
-            total_instagram_users=unique_users,
-            total_videos_processed=len(recent_posts),
-            last_run=recent_posts[-1].timestamp if recent_posts else ""
+            total_posts=total,
+            successful_posts=successful,
+            failed_posts=total - successful,
+            success_rate=(successful / total) * 100,
+            avg_processing_time=time_sum / total,
+            total_instagram_users=len(users),
+            total_videos_processed=total,
+            last_run=last_run
         )
     
     def print_analytics_report(self, days: int = 30):
         """Print comprehensive analytics report"""
-        metrics = self.get_system_metrics(days)
+        # Locate the window once and share it between all sections
+        recent_posts = self._recent_posts(days)
+        metrics = self._summarize(recent_posts)
         
         print("\n" + "="*70)
         print(f"📊 ANALYTICS REPORT - LAST {days} DAYS")
@@ -152,25 +301,25 @@ class AnalyticsTracker:
         print(f"🎬 Videos Processed: {metrics.total_videos_processed}")
         
         if metrics.last_run:
-            last_run = datetime.fromisoformat(metrics.last_run)
+            last_run = datetime.fromtimestamp(metrics.last_run)
             print(f"🕐 Last Run: {last_run.strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Platform breakdown
-        platform_stats = self._get_platform_stats(days)
+        platform_stats = self._get_platform_stats(recent_posts)
         if platform_stats:
             print(f"\n📱 Platform Breakdown:")
             for platform, stats in platform_stats.items():
                 print(f"   • {platform.title()}: {stats['success']}/{stats['total']} ({stats['rate']:.1f}%)")
         
         # Top performing content
-        top_content = self._get_top_content(days)
+        top_content = self._get_top_content(recent_posts, limit=3)
         if top_content:
             print(f"\n🏆 Top Performing Content:")
-            for i, post in enumerate(top_content[:3], 1):
+            for i, post in enumerate(top_content, 1):
                 print(f"   {i}. {post.instagram_shortcode} - {post.instagram_likes:,} likes")
         
         # Error analysis
-        error_analysis = self._get_error_analysis(days)
+        error_analysis = self._get_error_analysis(recent_posts, limit=ERROR_REPORT_LIMIT)
         if error_analysis:
             print(f"\n🔍 Common Errors:")
             for error, count in error_analysis.items():
@@ -178,62 +327,40 @@ class AnalyticsTracker:
         
         print("="*70)
     
-    def _get_platform_stats(self, days: int) -> Dict[str, Dict]:
+    def _get_platform_stats(self, recent_posts: List[PostMetrics]) -> Dict[str, Dict]:
         """Get platform-specific statistics"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_posts = [
-            post for post in self.posts 
-            if datetime.fromisoformat(post.timestamp) > cutoff_date
-        ]
-        
-        platform_stats = {}
-        for post in recent_posts:
-            platform = post.platform
-            if platform not in platform_stats:
-                platform_stats[platform] = {'total': 0, 'success': 0}
-            
-            platform_stats[platform]['total'] += 1
-            if post.success:
-                platform_stats[platform]['success'] += 1
+        totals = Counter(post.platform for post in recent_posts)
+        successes = Counter(post.platform for post in recent_posts if post.success)
         
-        # Calculate rates
-        for platform, stats in platform_stats.items():
-            stats['rate'] = (stats['success'] / stats['total']) * 100 if stats['total'] > 0 else 0
+        platform_stats = {
+            platform: {
+                'total': total,
+                'success': successes[platform],
+                'rate': (successes[platform] / total) * 100
+            }
+            for platform, total in totals.items()
+        }
         
         return platform_stats
     
-    def _get_top_content(self, days: int) -> List[PostMetrics]:
-        """Get top performing content by engagement"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_posts = [
-            post for post in self.posts 
-            if datetime.fromisoformat(post.timestamp) > cutoff_date and post.success
-        ]
+    def _get_top_content(self, recent_posts: List[PostMetrics], limit: int = 3) -> List[PostMetrics]:
+        """Get the top performing content by engagement"""
+        successful_posts = (
+            post for post in recent_posts 
+            if post.success
+        )
         
-        return sorted(recent_posts, key=lambda x: x.instagram_likes, reverse=True)
+        return heapq.nlargest(limit, successful_posts, key=attrgetter('instagram_likes'))
     
-    def _get_error_analysis(self, days: int) -> Dict[str, int]:
-        """Analyze common errors"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        failed_posts = [
-            post for post in self.posts 
-            if datetime.fromisoformat(post.timestamp) > cutoff_date and not post.success
-        ]
-        
-        error_counts = {}
-        for post in failed_posts:
-            error = post.error_message or "Unknown error"
-            # Simplify error messages
-            if "rate limit" in error.lower():
-                error = "Rate limiting"
-            elif "unauthorized" in error.lower():
-                error = "Authentication error"
-            elif "forbidden" in error.lower():
-                error = "Permission error"
-            
-            error_counts[error] = error_counts.get(error, 0) + 1
+    def _get_error_analysis(self, recent_posts: List[PostMetrics], limit: Optional[int] = None) -> Dict[str, int]:
+        """Analyze common errors, keeping only the `limit` most frequent if given"""
+        failed_posts = (
+            post for post in recent_posts 
+            if not post.success
+        )
         
-        return dict(sorted(error_counts.items(), key=lambda x: x[1], reverse=True))
+        error_counts = Counter(_classify_error(post.error_message) for post in failed_posts)
+        return dict(error_counts.most_common(limit))
 
 # Global analytics instance
 analytics = AnalyticsTracker()
@@ -4,8 +4,13 @@ Runs automatically without user input to demonstrate the full workflow
 """
 import asyncio
 import os
+import re
 import sys
-from typing import List, Dict, Any
+import textwrap
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple
+from aiolimiter import AsyncLimiter
 from loguru import logger
 from dotenv import load_dotenv
 import tweepy
@@ -22,35 +27,78 @@ logger.add(
     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 )
 
+# Videos processed at the same time
+DEMO_CONCURRENCY = 3
+
+# Minimum seconds between Twitter posts
+POST_INTERVAL = 5
+
+# Twitter character limit
+MAX_TWEET_LENGTH = 280
+
+# Emoji that already make a post engaging, matched in one scan
+ENGAGEMENT_EMOJI = re.compile('[🔥💯✨🚀]')
+
+@lru_cache(maxsize=1024)
+def _rule_based_transform(caption: str, likes: int, hashtags: Tuple[str, ...]) -> str:
+    """Rule-based Twitter transformation, memoized since demo runs feed the same captions"""
+    # Extract main content (remove excessive hashtags)
+    main_content = caption.partition('\n')[0]
+    
+    # Limit words and clean up
+    words = main_content.split()[:25]
+    transformed = " ".join(words)
+    
+    # Add engagement elements
+    suffix = "" if ENGAGEMENT_EMOJI.search(transformed) else " 🚀"
+    
+    # Add stats if impressive
+    if likes > 1000:
+        suffix += f" ({likes} likes!)"
+    
+    # Add 1-2 hashtags
+    if hashtags:
+        suffix += " " + " ".join(hashtags)
+    
+    # Ensure Twitter length by shortening the text at a word boundary, keeping the suffix whole
+    budget = MAX_TWEET_LENGTH - len(suffix)
+    if len(transformed) > budget:
+        transformed = textwrap.shorten(transformed, width=max(budget, 3), placeholder="...")
+    
+    return transformed + suffix
+
+# Simulated Instagram videos, built once and shared read-only by every extractor
+SAMPLE_VIDEOS = (
+    MappingProxyType({
+        'shortcode': 'ABC123XYZ',
+        'caption': '🚀 Just launched my new AI project! This system automatically transforms content across social media platforms using advanced machine learning. The future of content creation is here! What do you think about AI-powered automation? #AI #MachineLearning #Innovation',
+        'likes': 2847,
+        'comments': 156,
+        'date': '2025-01-29 10:30:00',
+        'hashtags': ('#AI', '#MachineLearning')
+    }),
+    MappingProxyType({
+        'shortcode': 'DEF456UVW', 
+        'caption': '💡 Building something incredible with CrewAI and OpenAI! My latest project uses multiple AI agents working together to create content for different social media platforms. The coordination between agents is mind-blowing! 🤖✨ #CrewAI #OpenAI #MultiAgent',
+        'likes': 1923,
+        'comments': 89,
+        'date': '2025-01-28 15:45:00',
+        'hashtags': ('#CrewAI', '#OpenAI')
+    })
+)
+
 class MockInstagramExtractor:
     """Simulates Instagram content extraction"""
     
     def __init__(self):
-        self.sample_videos = [
-            {
-                'shortcode': 'ABC123XYZ',
-                'caption': '🚀 Just launched my new AI project! This system automatically transforms content across social media platforms using advanced machine learning. The future of content creation is here! What do you think about AI-powered automation? #AI #MachineLearning #Innovation',
-                'likes': 2847,
-                'comments': 156,
-                'date': '2025-01-29 10:30:00',
-                'hashtags': ['#AI', '#MachineLearning']
-            },
-            {
-                'shortcode': 'DEF456UVW', 
-                'caption': '💡 Building something incredible with CrewAI and OpenAI! My latest project uses multiple AI agents working together to create content for different social media platforms. The coordination between agents is mind-blowing! 🤖✨ #CrewAI #OpenAI #MultiAgent',
-                'likes': 1923,
-                'comments': 89,
-                'date': '2025-01-28 15:45:00',
-                'hashtags': ['#CrewAI', '#OpenAI']
-            }
-        ]
+        self.sample_videos = SAMPLE_VIDEOS
     
     async def get_user_videos(self, username: str, max_videos: int = 2) -> List[Dict]:
         """Simulate extracting videos"""
         logger.info(f"📸 Simulating extraction from @{username}...")
         logger.info(f"👤 Found profile: {username} (196,688 followers)")
         
-        videos = self.sample_videos[:max_videos]
+        videos = list(self.sample_videos[:max_videos])
         
         for i, video in enumerate(videos, 1):
             logger.success(f"✅ Found video {i}: {video['shortcode']} ({video['likes']} likes, {video['comments']} comments)")
@@ -88,33 +136,7 @@ class ContentTransformer:
     
     def _simple_transform(self, caption: str, content: Dict) -> str:
         """Simple rule-based transformation"""
-        # Extract main content (remove excessive hashtags)
-        lines = caption.split('\n')
-        main_content = lines[0] if lines else caption
-        
-        # Limit words and clean up
-        words = main_content.split()[:25]
-        transformed = " ".join(words)
-        
-        # Add engagement elements
-        if not any(emoji in transformed for emoji in ['🔥', '💯', '✨', '🚀']):
-            transformed += " 🚀"
-        
-        # Add stats if impressive
-        likes = content.get('likes', 0)
-        if likes > 1000:
-            transformed += f" ({likes} likes!)"
-        
-        # Add 1-2 hashtags
-        hashtags = content.get('hashtags', [])[:2]
-        if hashtags:
-            transformed += " " + " ".join(hashtags)
-        
-        # Ensure Twitter length
-        if len(transformed) > 280:
-            transformed = transformed[:277] + "..."
-        
-        return transformed
+        return _rule_based_transform(caption, content.get('likes', 0), tuple(content.get('hashtags', [])[:2]))
 
 class TwitterPoster:
     """Post content to Twitter"""
@@ -153,7 +175,8 @@ class TwitterPoster:
             if len(content) > 280:
                 content = content[:277] + "..."
             
-            response = self.client.create_tweet(text=content)
+            # tweepy is synchronous, keep the event loop free while the request is in flight
+            response = await asyncio.to_thread(self.client.create_tweet, text=content)
             
             post_url = f"https://twitter.com/user/status/{response.data['id']}"
             logger.success(f"✅ Posted to Twitter: {response.data['id']}")
@@ -209,16 +232,26 @@ async def run_auto_demo():
         logger.info("🐦 Step 3: Initializing Twitter poster...")
         twitter = TwitterPoster()
         
-        # Step 3: Process each video
-        for i, video in enumerate(videos, 1):
-            logger.info(f"🎬 Processing video {i}/{len(videos)}: {video['shortcode']}")
-            
-            # Transform content
-            transformed_content = await transformer.transform_for_twitter(video)
-            
-            # Post to Twitter
-            post_result = await twitter.post_tweet(transformed_content, video)
-            
+        # Step 3: Process videos concurrently, spacing the posts out for rate limiting
+        semaphore = asyncio.Semaphore(DEMO_CONCURRENCY)
+        rate_limiter = AsyncLimiter(1, POST_INTERVAL)
+        
+        async def process_video(i: int, video: Dict):
+            async with semaphore:
+                logger.info(f"🎬 Processing video {i}/{len(videos)}: {video['shortcode']}")
+                
+                # Transform content
+                transformed_content = await transformer.transform_for_twitter(video)
+                
+                # Post to Twitter
+                async with rate_limiter:
+                    post_result = await twitter.post_tweet(transformed_content, video)
+                
+                return transformed_content, post_result
+        
+        processed = await asyncio.gather(*[process_video(i, video) for i, video in enumerate(videos, 1)])
+        
+        for i, (video, (transformed_content, post_result)) in enumerate(zip(videos, processed), 1):
             results['posts_created'] += 1
             
             if post_result['success']:
@@ -235,10 +268,6 @@ async def run_auto_demo():
                 'post_result': post_result,
                 'video_stats': f"{video['likes']} likes, {video['comments']} comments"
             })
-            
-            # Rate limiting delay
-            logger.info("⏳ Waiting 5 seconds for rate limiting...")
-            await asyncio.sleep(5)
         
         # Print results
         print_demo_results(results)
@@ -5,19 +5,13 @@ Provides a user-friendly command-line interface
 import asyncio
 import argparse
 import sys
+from datetime import datetime
 from typing import List
+from functools import lru_cache
 from loguru import logger
-from config_helper import check_system_ready
-from analytics import analytics
-from specific_video_poster import post_specific_video
-from complete_pipeline import run_complete_pipeline
 
-def create_parser():
-    """Create command line argument parser"""
-    parser = argparse.ArgumentParser(
-        description="Instagram-to-Social Media Agent System",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+# Usage examples shown after --help
+EPILOG = """
 Examples:
   # Post specific Instagram video
   python cli.py post --url https://www.instagram.com/reel/ABC123/
@@ -35,6 +29,26 @@ Examples:
   # Start web interface
   python cli.py web
         """
+
+# Startup banner
+BANNER = """
+╔══════════════════════════════════════════════════════════════╗
+║                                                              ║
+║    🤖 INSTAGRAM-TO-SOCIAL MEDIA AGENT SYSTEM                ║
+║                                                              ║
+║    Transform Instagram videos into engaging social posts    ║
+║    AI-powered • Multi-platform • Automated                  ║
+║                                                              ║
+╚══════════════════════════════════════════════════════════════╝
+    """
+
+@lru_cache(maxsize=1)
+def create_parser():
+    """Create command line argument parser"""
+    parser = argparse.ArgumentParser(
+        description="Instagram-to-Social Media Agent System",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG
     )
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
@@ -71,6 +85,8 @@ Examples:
 
 async def handle_post_command(args):
     """Handle post command"""
+    from specific_video_poster import post_specific_video
+    
     print("🎯 POSTING SPECIFIC INSTAGRAM VIDEO")
     print("="*50)
     
@@ -89,6 +105,8 @@ async def handle_post_command(args):
 
 async def handle_pipeline_command(args):
     """Handle pipeline command"""
+    from complete_pipeline import run_complete_pipeline
+    
     print(f"🚀 RUNNING COMPLETE PIPELINE FOR @{args.user}")
     print("="*50)
     
@@ -101,6 +119,8 @@ async def handle_pipeline_command(args):
 
 def handle_config_command(args):
     """Handle config command"""
+    from config_helper import check_system_ready
+    
     if args.check or args.validate:
         print("🔧 CHECKING SYSTEM CONFIGURATION")
         print("="*50)
@@ -113,6 +133,9 @@ def handle_config_command(args):
 
 def handle_analytics_command(args):
     """Handle analytics command"""
+    from analytics import analytics
+    from json_codec import serialize_json
+    
     print(f"📊 ANALYTICS REPORT - LAST {args.days} DAYS")
     print("="*50)
     
@@ -120,7 +143,6 @@ def handle_analytics_command(args):
     
     if args.export:
         # Export analytics data
-        import json
         metrics = analytics.get_system_metrics(args.days)
         
         export_data = {
@@ -133,7 +155,7 @@ def handle_analytics_command(args):
             },
             'posts': [
                 {
-                    'timestamp': post.timestamp,
+                    'timestamp': datetime.fromtimestamp(post.timestamp).isoformat(),
                     'instagram_user': post.instagram_user,
                     'platform': post.platform,
                     'success': post.success,
@@ -143,8 +165,8 @@ def handle_analytics_command(args):
             ]
         }
         
-        with open(args.export, 'w') as f:
-            json.dump(export_data, f, indent=2)
+        with open(args.export, 'wb') as f:
+            f.write(serialize_json(export_data))
         
         print(f"📁 Analytics exported to: {args.export}")
 
@@ -158,7 +180,8 @@ def handle_web_command(args):
         import uvicorn
         from simple_web import app
         
-        uvicorn.run(app, host=args.host, port=args.port)
+        # "auto" picks uvloop and httptools when installed (uvicorn[standard]) and falls back otherwise
+        uvicorn.run(app, host=args.host, port=args.port, loop="auto", http="auto", access_log=False)
     except ImportError:
         print("❌ Web interface dependencies not installed")
         print("💡 Install with: pip install fastapi uvicorn")
@@ -167,17 +190,7 @@ def handle_web_command(args):
 
 def print_banner():
     """Print application banner"""
-    banner = """
-╔══════════════════════════════════════════════════════════════╗
-║                                                              ║
-║    🤖 INSTAGRAM-TO-SOCIAL MEDIA AGENT SYSTEM                ║
-║                                                              ║
-║    Transform Instagram videos into engaging social posts    ║
-║    AI-powered • Multi-platform • Automated                  ║
-║                                                              ║
-╚══════════════════════════════════════════════════════════════╝
-    """
-    print(banner)
+    print(BANNER)
 
 async def main():
     """Main CLI entry point"""
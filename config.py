@@ -2,7 +2,7 @@
 Configuration management for the Instagram-to-Social Media Agent System
 """
 import os
-from typing import Optional, List
+from typing import Callable, Optional, List
 from pydantic import BaseSettings, Field
 from dotenv import load_dotenv
 
@@ -44,6 +44,13 @@ class Settings(BaseSettings):
     # Application Settings
     max_videos_per_user: int = Field(5, env="MAX_VIDEOS_PER_USER")
     content_check_interval: int = Field(3600, env="CONTENT_CHECK_INTERVAL")  # seconds
+    max_concurrency: int = Field(5, env="MAX_CONCURRENCY")  # parallel transformations
+    instagram_concurrency: int = Field(3, env="INSTAGRAM_CONCURRENCY")  # parallel user extractions
+    workflow_batch_size: int = Field(8, env="WORKFLOW_BATCH_SIZE")  # users per workflow batch
+    linkedin_posts_per_minute: int = Field(5, env="LINKEDIN_POSTS_PER_MINUTE")
+    twitter_max_concurrent: int = Field(5, env="TWITTER_MAX_CONCURRENT")
+    twitter_posts_per_window: int = Field(300, env="TWITTER_POSTS_PER_WINDOW")  # per 3 hours
+    schedule_concurrency: int = Field(10, env="SCHEDULE_CONCURRENCY")  # parallel scheduling calls
     
     # Content Generation Settings
     max_twitter_length: int = 280
@@ -53,6 +60,13 @@ class Settings(BaseSettings):
     storage_path: str = Field("./storage", env="STORAGE_PATH")
     temp_path: str = Field("./temp", env="TEMP_PATH")
     
+    # Posting schedule: JSON of 96 per-15-minute engagement scores per platform
+    posting_schedule_path: Optional[str] = Field(None, env="POSTING_SCHEDULE_PATH")
+    
+    # LLM Response Cache
+    llm_cache_path: str = Field("./storage/llm_cache.db", env="LLM_CACHE_PATH")
+    llm_cache_ttl: int = Field(7 * 24 * 3600, env="LLM_CACHE_TTL")  # seconds
+    
     # Logging
     log_level: str = Field("INFO", env="LOG_LEVEL")
     log_file: str = Field("agent_system.log", env="LOG_FILE")
@@ -116,3 +130,12 @@ CONTENT_PROMPTS = {
     Video description: {description}
     """
 }
+
+def _compile_template(template: str) -> Callable[[str, str], str]:
+    """Pre-split a prompt template so filling it is plain string concatenation"""
+    head, _, rest = template.partition('{content}')
+    middle, _, tail = rest.partition('{description}')
+    return lambda content, description: head + content + middle + description + tail
+
+# Prompt builders: PROMPT_BUILDERS[platform](content, description) == CONTENT_PROMPTS[platform].format(...)
+PROMPT_BUILDERS = {platform: _compile_template(template) for platform, template in CONTENT_PROMPTS.items()}
@@ -3,15 +3,20 @@ Full Pipeline Test: Instagram Video → Twitter Post
 Tests the complete workflow from Instagram extraction to Twitter posting
 """
 import asyncio
+import io
 import os
+import shelve
 import sys
-from typing import List, Dict, Any
+import time
+from itertools import islice
+from typing import List, Dict, Any, Optional
 from loguru import logger
 from dotenv import load_dotenv
-import tweepy
 import instaloader
 from datetime import datetime
-import openai
+import pipeline_core
+from json_codec import serialize_json
+from pipeline_core import ENGAGEMENT_EMOJI, WORD_PATTERN, close_clients, truncate
 
 # Load environment variables
 load_dotenv()
@@ -21,9 +26,19 @@ logger.remove()
 logger.add(
     sys.stderr,
     level="INFO",
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+    enqueue=True,  # Format and write records on loguru's worker thread, off the event loop
+    backtrace=False,
+    diagnose=False
 )
 
+# Maximum number of videos transformed and posted at once
+MAX_CONCURRENT_VIDEOS = 3
+
+# Extracted videos are reused across runs for this many seconds
+VIDEO_CACHE_PATH = "./storage/instagram_videos"
+VIDEO_CACHE_TTL = 900
+
 class InstagramExtractor:
     """Extract content from Instagram users"""
     
@@ -44,80 +59,75 @@ class InstagramExtractor:
     async def get_user_videos(self, username: str, max_videos: int = 2) -> List[Dict]:
         """Extract recent videos from Instagram user"""
         try:
+            cached = self._get_cached_videos(username, max_videos)
+            if cached is not None:
+                logger.info(f"♻️ Reusing {len(cached)} recently extracted videos from @{username}")
+                return cached
+            
             logger.info(f"📸 Extracting videos from @{username}...")
             
             # Get profile
             profile = instaloader.Profile.from_username(self.loader.context, username)
             logger.info(f"👤 Found profile: {profile.full_name} ({profile.followers} followers)")
             
-            videos = []
-            count = 0
+            # Stop paging through posts as soon as enough videos are found
+            date_format = "%Y-%m-%d %H:%M:%S"
+            video_posts = islice((post for post in profile.get_posts() if post.is_video), max_videos)
+            videos = [
+                {
+                    'shortcode': post.shortcode,
+                    'caption': post.caption or "",
+                    'video_url': post.video_url,
+                    'likes': post.likes,
+                    'comments': post.comments,
+                    'date': post.date.strftime(date_format),
+                    'hashtags': post.caption_hashtags if post.caption else [],
+                    'mentions': post.caption_mentions if post.caption else []
+                }
+                for post in video_posts
+            ]
             
-            for post in profile.get_posts():
-                if count >= max_videos:
-                    break
-                
-                # Look for video posts
-                if post.is_video:
-                    video_data = {
-                        'shortcode': post.shortcode,
-                        'caption': post.caption or "",
-                        'video_url': post.video_url,
-                        'likes': post.likes,
-                        'comments': post.comments,
-                        'date': post.date.strftime("%Y-%m-%d %H:%M:%S"),
-                        'hashtags': post.caption_hashtags if post.caption else [],
-                        'mentions': post.caption_mentions if post.caption else []
-                    }
-                    videos.append(video_data)
-                    count += 1
-                    logger.success(f"✅ Found video: {post.shortcode} ({post.likes} likes, {post.comments} comments)")
+            for video in videos:
+                logger.success(f"✅ Found video: {video['shortcode']} ({video['likes']} likes, {video['comments']} comments)")
             
             logger.success(f"📥 Extracted {len(videos)} videos from @{username}")
+            if videos:
+                self._cache_videos(username, max_videos, videos)
             return videos
             
         except Exception as e:
             logger.error(f"❌ Failed to extract from @{username}: {str(e)}")
             return []
-
-class ContentTransformer:
-    """Transform Instagram content for Twitter using AI"""
     
-    def __init__(self):
-        self.openai_key = os.getenv('OPENAI_API_KEY')
-        if self.openai_key:
-            openai.api_key = self.openai_key
-            logger.info("✅ OpenAI API initialized")
-        else:
-            logger.warning("⚠️ No OpenAI API key found - using simple transformation")
-    
-    async def transform_for_twitter(self, instagram_content: Dict) -> str:
-        """Transform Instagram video content for Twitter"""
+    def _get_cached_videos(self, username: str, max_videos: int) -> Optional[List[Dict]]:
+        """Return videos extracted within the cache TTL, or None"""
         try:
-            original_caption = instagram_content['caption']
-            video_stats = f"{instagram_content['likes']} likes, {instagram_content['comments']} comments"
-            
-            logger.info(f"🧠 Transforming content for Twitter...")
-            logger.info(f"📝 Original caption: {original_caption[:100]}...")
-            
-            if self.openai_key:
-                # Use AI transformation
-                transformed = await self._ai_transform(original_caption, video_stats)
-            else:
-                # Use simple transformation
-                transformed = self._simple_transform(original_caption, instagram_content)
-            
-            logger.success(f"✨ Transformed content: {transformed[:100]}...")
-            return transformed
+            with shelve.open(VIDEO_CACHE_PATH) as cache:
+                entry = cache.get(f"{username}:{max_videos}")
+            if entry and time.time() - entry[0] <= VIDEO_CACHE_TTL:
+                return entry[1]
+            return None
             
         except Exception as e:
-            logger.error(f"❌ Content transformation failed: {e}")
-            return self._simple_transform(instagram_content['caption'], instagram_content)
+            logger.warning(f"⚠️ Could not read video cache: {e}")
+            return None
     
-    async def _ai_transform(self, caption: str, stats: str) -> str:
-        """AI-powered content transformation"""
+    def _cache_videos(self, username: str, max_videos: int, videos: List[Dict]):
+        """Persist extracted videos so repeated runs skip Instagram"""
         try:
-            prompt = f"""
+            os.makedirs(os.path.dirname(VIDEO_CACHE_PATH), exist_ok=True)
+            with shelve.open(VIDEO_CACHE_PATH) as cache:
+                cache[f"{username}:{max_videos}"] = (time.time(), videos)
+                
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write video cache: {e}")
+
+class ContentTransformer(pipeline_core.ContentTransformer):
+    """Transform Instagram content for Twitter using AI"""
+    
+    __slots__ = ()
+    
+    TRANSFORM_PROMPT = """
 Transform this Instagram video caption into an engaging Twitter post:
 
 Original Caption: "{caption}"
@@ -132,34 +142,14 @@ Requirements:
 - Make it more conversational
 
 Twitter Post:"""
-
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=100,
-                temperature=0.7
-            )
-            
-            transformed = response.choices[0].message.content.strip()
-            
-            # Ensure it's under 280 characters
-            if len(transformed) > 280:
-                transformed = transformed[:277] + "..."
-            
-            return transformed
-            
-        except Exception as e:
-            logger.error(f"❌ AI transformation failed: {e}")
-            return self._simple_transform(caption, {'likes': 0, 'comments': 0})
     
     def _simple_transform(self, caption: str, content: Dict) -> str:
         """Simple rule-based transformation"""
         # Clean up caption
-        words = caption.split()[:25]  # Limit words
-        transformed = " ".join(words)
+        transformed = " ".join(m.group() for m in islice(WORD_PATTERN.finditer(caption), 25))  # Limit words
         
         # Add engagement elements
-        if not any(emoji in transformed for emoji in ['🔥', '💯', '✨', '🚀']):
+        if not ENGAGEMENT_EMOJI.search(transformed):
             transformed += " 🔥"
         
         # Add stats if impressive
@@ -168,60 +158,18 @@ Twitter Post:"""
             transformed += f" ({likes} likes!)"
         
         # Ensure Twitter length
-        if len(transformed) > 280:
-            transformed = transformed[:277] + "..."
+        transformed = truncate(transformed, 280)
         
         return transformed
 
-class TwitterPoster:
+class TwitterPoster(pipeline_core.TwitterPoster):
     """Post content to Twitter"""
     
-    def __init__(self):
-        self.api_key = os.getenv('TWITTER_API_KEY')
-        self.api_secret = os.getenv('TWITTER_API_SECRET')
-        self.access_token = os.getenv('TWITTER_ACCESS_TOKEN')
-        self.access_token_secret = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
-        
-        if not all([self.api_key, self.api_secret, self.access_token, self.access_token_secret]):
-            raise ValueError("Missing Twitter API credentials")
-        
-        self.client = tweepy.Client(
-            consumer_key=self.api_key,
-            consumer_secret=self.api_secret,
-            access_token=self.access_token,
-            access_token_secret=self.access_token_secret,
-            wait_on_rate_limit=True
-        )
-        logger.info("✅ Twitter API initialized")
+    __slots__ = ()
     
-    async def post_tweet(self, content: str, source_info: Dict = None) -> Dict:
-        """Post content to Twitter"""
-        try:
-            logger.info("🐦 Posting to Twitter...")
-            
-            # Add source attribution if provided
-            if source_info:
-                content += f"\n\n📸 Inspired by Instagram content"
-            
-            response = self.client.create_tweet(text=content)
-            
-            post_url = f"https://twitter.com/user/status/{response.data['id']}"
-            logger.success(f"✅ Posted to Twitter: {response.data['id']}")
-            logger.info(f"🔗 View post: {post_url}")
-            
-            return {
-                'success': True,
-                'post_id': response.data['id'],
-                'url': post_url,
-                'content': content
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Twitter posting failed: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e)
-            }
+    def _attribution(self, source_info: Dict) -> str:
+        """Suffix crediting the source Instagram content"""
+        return "\n\n📸 Inspired by Instagram content"
 
 async def run_full_pipeline(instagram_username: str, max_videos: int = 2):
     """Run the complete Instagram → Twitter pipeline"""
@@ -257,16 +205,28 @@ async def run_full_pipeline(instagram_username: str, max_videos: int = 2):
         logger.info("🐦 Step 3: Initializing Twitter poster...")
         twitter = TwitterPoster()
         
-        # Step 3: Process each video
-        for i, video in enumerate(videos, 1):
-            logger.info(f"🎬 Processing video {i}/{len(videos)}: {video['shortcode']}")
-            
-            # Transform content
-            transformed_content = await transformer.transform_for_twitter(video)
-            
-            # Post to Twitter
-            post_result = await twitter.post_tweet(transformed_content, video)
-            
+        # Step 3: Transform and post videos concurrently, bounded by a semaphore
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_VIDEOS)
+        
+        embeddings = await transformer.embed_captions(videos)
+        
+        async def process(i: int, video: Dict):
+            async with semaphore:
+                logger.info(f"🎬 Processing video {i}/{len(videos)}: {video['shortcode']}")
+                started = time.perf_counter()
+                transformed_content = await transformer.transform_for_twitter(video, embeddings[i - 1])
+                post_result = await twitter.post_tweet(transformed_content, video)
+                return transformed_content, post_result, time.perf_counter() - started
+        
+        batch_started = time.perf_counter()
+        processed = await asyncio.gather(
+            *(process(i, video) for i, video in enumerate(videos, 1))
+        )
+        runtime_latency = time.perf_counter() - batch_started
+        avg_video_latency = sum(latency for _, _, latency in processed) / len(processed) if processed else 0.0
+        logger.info(f"⏱️ Processed {len(processed)} videos in {runtime_latency:.2f}s ({avg_video_latency:.2f}s average per video)")
+        
+        for i, (video, (transformed_content, post_result, _)) in enumerate(zip(videos, processed), 1):
             results['posts_created'] += 1
             
             if post_result['success']:
@@ -278,13 +238,10 @@ async def run_full_pipeline(instagram_username: str, max_videos: int = 2):
             
             results['post_details'].append({
                 'video_shortcode': video['shortcode'],
-                'original_caption': video['caption'][:100] + "..." if len(video['caption']) > 100 else video['caption'],
+                'original_caption': truncate(video['caption'], 100),
                 'transformed_content': transformed_content,
                 'post_result': post_result
             })
-            
-            # Rate limiting delay
-            await asyncio.sleep(5)
         
         # Print results
         print_pipeline_results(results)
@@ -296,37 +253,44 @@ async def run_full_pipeline(instagram_username: str, max_videos: int = 2):
         return results
 
 def print_pipeline_results(results: Dict[str, Any]):
-    """Print pipeline results"""
-    print("\n" + "="*70)
-    print("🎯 FULL PIPELINE RESULTS: INSTAGRAM → TWITTER")
-    print("="*70)
+    """Print pipeline results with a single write (and as JSON when PIPELINE_JSON_OUT is set)"""
+    buf = io.StringIO()
     
-    print(f"📸 Instagram User: @{results['instagram_user']}")
-    print(f"🎬 Videos Found: {results['videos_found']}")
-    print(f"📤 Posts Created: {results['posts_created']}")
-    print(f"✅ Successful Posts: {results['successful_posts']}")
-    print(f"❌ Failed Posts: {results['failed_posts']}")
+    print("\n" + "="*70, file=buf)
+    print("🎯 FULL PIPELINE RESULTS: INSTAGRAM → TWITTER", file=buf)
+    print("="*70, file=buf)
+    
+    print(f"📸 Instagram User: @{results['instagram_user']}", file=buf)
+    print(f"🎬 Videos Found: {results['videos_found']}", file=buf)
+    print(f"📤 Posts Created: {results['posts_created']}", file=buf)
+    print(f"✅ Successful Posts: {results['successful_posts']}", file=buf)
+    print(f"❌ Failed Posts: {results['failed_posts']}", file=buf)
     
     if results['posts_created'] > 0:
         success_rate = (results['successful_posts'] / results['posts_created']) * 100
-        print(f"📊 Success Rate: {success_rate:.1f}%")
+        print(f"📊 Success Rate: {success_rate:.1f}%", file=buf)
     
-    print("\n📱 Post Details:")
+    print("\n📱 Post Details:", file=buf)
     for i, detail in enumerate(results['post_details'], 1):
-        print(f"\n   🎬 Video {i}: {detail['video_shortcode']}")
-        print(f"   📝 Original: {detail['original_caption']}")
-        print(f"   ✨ Transformed: {detail['transformed_content']}")
+        print(f"\n   🎬 Video {i}: {detail['video_shortcode']}", file=buf)
+        print(f"   📝 Original: {detail['original_caption']}", file=buf)
+        print(f"   ✨ Transformed: {detail['transformed_content']}", file=buf)
         
         if detail['post_result']['success']:
-            print(f"   ✅ Posted: {detail['post_result']['url']}")
+            print(f"   ✅ Posted: {detail['post_result']['url']}", file=buf)
         else:
-            print(f"   ❌ Failed: {detail['post_result']['error']}")
+            print(f"   ❌ Failed: {detail['post_result']['error']}", file=buf)
     
     if results['successful_posts'] > 0:
-        print(f"\n🎉 SUCCESS! {results['successful_posts']} Instagram videos transformed and posted to Twitter!")
-        print("🔗 Check your Twitter account to see the posts!")
+        print(f"\n🎉 SUCCESS! {results['successful_posts']} Instagram videos transformed and posted to Twitter!", file=buf)
+        print("🔗 Check your Twitter account to see the posts!", file=buf)
     
-    print("="*70)
+    print("="*70, file=buf)
+    sys.stdout.write(buf.getvalue())
+    
+    if os.getenv("PIPELINE_JSON_OUT"):
+        sys.stdout.flush()
+        sys.stdout.buffer.write(serialize_json(results) + b"\n")
 
 async def main():
     """Main entry point"""
@@ -362,6 +326,8 @@ async def main():
             
     except Exception as e:
         logger.error(f"❌ Pipeline failed: {e}")
+    finally:
+        await close_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
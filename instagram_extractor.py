@@ -3,17 +3,36 @@ Advanced Instagram Content Extractor
 Handles rate limiting and uses multiple extraction methods
 """
 import asyncio
+import functools
+import hashlib
+import importlib.util
+import inspect
 import os
+import re
 import sys
 import time
 import random
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from types import MappingProxyType
+from typing import AsyncIterator, List, Dict, Any, Optional
 from loguru import logger
 from dotenv import load_dotenv
-import requests
+import aiohttp
 import instaloader
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 import json
+from json_codec import parse_json, serialize_json
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# aiohttp decodes brotli itself once the package is importable
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
 
 # Load environment variables
 load_dotenv()
@@ -26,42 +45,245 @@ logger.add(
     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 )
 
+# Connection pool limits and total request timeout (seconds) for the shared HTTP session
+MAX_CONNECTIONS = 32
+MAX_CONNECTIONS_PER_HOST = 4
+REQUEST_TIMEOUT = 10
+
+# Keep-alive pool size for Instaloader's own requests session
+INSTALOADER_POOL_SIZE = 10
+
+# Browser User-Agents rotated across web scraper requests
+_CHROME_UAS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+)
+
+# Headers shared by every User-Agent; aiohttp can only decode brotli when the brotli package is installed
+_BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, br' if BROTLI_AVAILABLE else 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Read-only header sets built once at import, one per User-Agent
+_UA_POOL = tuple(MappingProxyType({**_BASE_HEADERS, 'User-Agent': ua}) for ua in _CHROME_UAS)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get the process-wide HTTP session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=MAX_CONNECTIONS,
+                limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True
+            ),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+    return _session
+
+async def close_session():
+    """Close the process-wide HTTP session"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+# GraphQL query returning a user's timeline media, and how many posts to request per call
+PROFILE_POSTS_QUERY_HASH = "003056d32c2554def87228bc3fd9668a"
+POSTS_PER_QUERY = 50
+
+# Hashtags and mentions in scraped captions
+HASHTAG_PATTERN = re.compile(r'#\w+')
+MENTION_PATTERN = re.compile(r'@[\w.]+')
+
+# Lifetime (seconds) of cached extraction results; a stale copy is kept without expiry
+POSTS_CACHE_TTL = 600
+
+# Source tag of fabricated posts, which are never cached
+SAMPLE_SOURCE = 'sample_data'
+
+_redis = None
+_redis_enabled = REDIS_AVAILABLE
+
+# Errors meaning the Redis server is unreachable, as opposed to a problem with one entry
+REDIS_CONNECTION_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError) if REDIS_AVAILABLE else ()
+
+def get_redis():
+    """Get the process-wide Redis client, or None when Redis is not installed or unreachable"""
+    global _redis
+    if _redis is None and _redis_enabled:
+        _redis = aioredis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    return _redis if _redis_enabled else None
+
+def _disable_redis(error: Exception):
+    """Stop using Redis for the rest of the process after a connection failure"""
+    global _redis_enabled
+    if _redis_enabled:
+        logger.warning(f"⚠️ Redis cache unavailable, extracting without it: {error}")
+    _redis_enabled = False
+
+def _cache_key(fn, *args, **kwargs) -> str:
+    """Build the Redis key for a method call from its qualified name and bound arguments"""
+    bound = inspect.signature(fn).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    values = ':'.join(str(value) for value in list(bound.arguments.values())[1:])
+    return "instagram:" + hashlib.sha1(f"{fn.__qualname__}:{values}".encode('utf-8')).hexdigest()
+
+def cached(ttl: int = POSTS_CACHE_TTL):
+    """Cache a coroutine method's non-empty, non-sample result in Redis, keeping a stale copy for fallback"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            client = get_redis()
+            if client is None:
+                return await fn(self, *args, **kwargs)
+            
+            key = _cache_key(fn, *args, **kwargs)
+            try:
+                hit = await client.get(key)
+                if hit is not None:
+                    return parse_json(hit)
+            except REDIS_CONNECTION_ERRORS as e:
+                _disable_redis(e)
+                return await fn(self, *args, **kwargs)
+            except Exception as e:
+                logger.warning(f"⚠️ Ignoring unreadable cache entry for {fn.__qualname__}: {e}")
+            
+            result = await fn(self, *args, **kwargs)
+            if result and not any(post.get('source') == SAMPLE_SOURCE for post in result):
+                try:
+                    payload = serialize_json(result, indent=False)
+                    await client.set(key, payload, ex=ttl)
+                    await client.set(f"{key}:stale", payload)
+                except REDIS_CONNECTION_ERRORS as e:
+                    _disable_redis(e)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not cache result of {fn.__qualname__}: {e}")
+            return result
+        return wrapper
+    return decorator
+
+async def get_stale(fn, *args, **kwargs) -> List[Dict]:
+    """Get the last cached result of a method call regardless of its TTL"""
+    client = get_redis()
+    if client is None:
+        return []
+    
+    try:
+        hit = await client.get(f"{_cache_key(fn, *args, **kwargs)}:stale")
+        return parse_json(hit) if hit is not None else []
+    except REDIS_CONNECTION_ERRORS as e:
+        _disable_redis(e)
+        return []
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable stale cache entry for {fn.__qualname__}: {e}")
+        return []
+
+def _retry_after(response: aiohttp.ClientResponse) -> float:
+    """Seconds to wait from a response's Retry-After header, or 0 if it is missing or not a number"""
+    try:
+        return max(float(response.headers.get('Retry-After', 0)), 0)
+    except (TypeError, ValueError):
+        return 0
+
 class RateLimitHandler:
-    """Handle rate limiting with exponential backoff"""
+    """Handle rate limiting with a shared token bucket and exponential backoff"""
     
-    def __init__(self):
+    __slots__ = ('request_count', 'min_delay', 'max_delay', 'backoff_factor', 'min_rate',
+                 '_base_rate', '_rate', '_capacity', '_tokens', '_last_refill', '_cond')
+    
+    def __init__(self, rate: float = 0.5, burst: int = 1):
         self.request_count = 0
-        self.last_request_time = 0
-        self.min_delay = 2  # Minimum 2 seconds between requests
+        self.min_delay = 2  # Base delay for backoff after rate-limit errors
         self.max_delay = 60  # Maximum 60 seconds delay
         self.backoff_factor = 2
+        self.min_rate = 1 / self.max_delay  # Never slow down below one request per max_delay
         
-    async def wait_if_needed(self):
-        """Wait if we need to respect rate limits"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+        # Token bucket refilled at `rate` tokens per second; the condition lets
+        # concurrent callers wait safely and wakes them when the rate changes
+        self._base_rate = rate
+        self._rate = rate
+        self._capacity = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._cond = asyncio.Condition()
+    
+    def _refill(self):
+        """Add the tokens earned since the last refill"""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
         
-        if time_since_last < self.min_delay:
-            wait_time = self.min_delay - time_since_last
-            logger.info(f"⏳ Rate limiting: waiting {wait_time:.1f} seconds...")
-            await asyncio.sleep(wait_time)
+    async def wait_if_needed(self):
+        """Wait for a token so concurrent callers together respect the rate limit"""
+        async with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    break
+                
+                wait_time = (1 - self._tokens) / self._rate
+                logger.info(f"⏳ Rate limiting: waiting {wait_time:.1f} seconds...")
+                try:
+                    await asyncio.wait_for(self._cond.wait(), wait_time)
+                except asyncio.TimeoutError:
+                    pass
+            
+            self._tokens -= 1
+            self.request_count += 1
+            
+            # Recover additively towards the base rate after a rate-limit error halved it
+            if self._rate < self._base_rate:
+                self._rate = min(self._base_rate, self._rate + self._base_rate / 10)
+    
+    async def handle_rate_limit_error(self, attempt: int, retry_after: float = 0):
+        """
+        Handle rate limit errors by halving the request rate and backing off
         
-        self.last_request_time = time.time()
-        self.request_count += 1
-    
-    async def handle_rate_limit_error(self, attempt: int):
-        """Handle rate limit errors with exponential backoff"""
-        wait_time = min(self.min_delay * (self.backoff_factor ** attempt), self.max_delay)
-        jitter = random.uniform(0.1, 0.5) * wait_time  # Add jitter
-        total_wait = wait_time + jitter
+        Args:
+            attempt: Zero-based retry attempt, for exponential backoff
+            retry_after: Seconds the server asked us to wait (Retry-After header), if any
+        """
+        async with self._cond:
+            self._refill()
+            self._rate = max(self._rate / 2, self.min_rate)
+            self._cond.notify_all()
         
+        # Honor the server's hint, never waiting less than the exponential backoff
+        total_wait = self._backoff_delay(attempt, retry_after)
         logger.warning(f"🚫 Rate limited! Waiting {total_wait:.1f} seconds (attempt {attempt})...")
         await asyncio.sleep(total_wait)
+    
+    async def backoff(self, attempt: int):
+        """Back off exponentially before retrying a failed request, leaving the request rate unchanged"""
+        total_wait = self._backoff_delay(attempt)
+        logger.info(f"🔁 Retrying in {total_wait:.1f} seconds (attempt {attempt})...")
+        await asyncio.sleep(total_wait)
+    
+    def _backoff_delay(self, attempt: int, retry_after: float = 0) -> float:
+        """Exponential backoff for an attempt, raised to retry_after and capped at max_delay, plus jitter"""
+        wait_time = min(max(retry_after, self.min_delay * (self.backoff_factor ** attempt)), self.max_delay)
+        jitter = random.uniform(0, 0.1) * wait_time  # Add jitter
+        return wait_time + jitter
 
 class InstagramBasicDisplayAPI:
     """Official Instagram Basic Display API"""
     
-    def __init__(self):
+    __slots__ = ('session', 'rate_limiter', 'app_id', 'app_secret', 'access_token', 'base_url')
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        self.session = session
+        self.rate_limiter = RateLimitHandler()
         self.app_id = os.getenv('INSTAGRAM_APP_ID')
         self.app_secret = os.getenv('INSTAGRAM_APP_SECRET')
         self.access_token = os.getenv('INSTAGRAM_ACCESS_TOKEN')
@@ -72,6 +294,7 @@ class InstagramBasicDisplayAPI:
         else:
             logger.warning("⚠️ Instagram Basic Display API not configured")
     
+    @cached()
     async def get_user_media(self, user_id: str = 'me', limit: int = 10) -> List[Dict]:
         """Get user media using official API"""
         if not self.access_token:
@@ -81,14 +304,26 @@ class InstagramBasicDisplayAPI:
             url = f"{self.base_url}/{user_id}/media"
             params = {
                 'fields': 'id,media_type,media_url,permalink,caption,timestamp,like_count,comments_count',
-                'limit': limit,
+                'limit': str(limit),
                 'access_token': self.access_token
             }
             
-            response = requests.get(url, params=params)
+            session = self.session or await get_session()
+            for attempt in range(3):
+                async with session.get(url, params=params) as response:
+                    status = response.status
+                    if status == 200:
+                        data = parse_json(await response.read())
+                    else:
+                        error_text = await response.text()
+                        retry_after = _retry_after(response)
+                
+                if status != 429:
+                    break
+                # Rate limited, retry after the server's suggested delay
+                await self.rate_limiter.handle_rate_limit_error(attempt, retry_after)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status == 200:
                 media_items = []
                 
                 for item in data.get('data', []):
@@ -104,10 +339,10 @@ class InstagramBasicDisplayAPI:
                             'source': 'instagram_basic_api'
                         })
                 
-                logger.success(f"✅ Retrieved {len(media_items)} videos via Basic Display API")
+                logger.opt(lazy=True).success("✅ Retrieved {} videos via Basic Display API", lambda: len(media_items))
                 return media_items
             else:
-                logger.error(f"❌ API error: {response.status_code} - {response.text}")
+                logger.error(f"❌ API error: {status} - {error_text}")
                 return []
                 
         except Exception as e:
@@ -117,56 +352,47 @@ class InstagramBasicDisplayAPI:
 class InstagramWebScraper:
     """Web scraping with advanced rate limiting"""
     
-    def __init__(self):
+    __slots__ = ('rate_limiter', 'session')
+    
+    # Sample captions, formatted with the username, used only when IG_ALLOW_SAMPLES is set
+    _SAMPLE_CAPTION_TEMPLATES = (
+        "🚀 Amazing content from @{u}! This video shows incredible creativity and innovation. The attention to detail is outstanding! #creativity #innovation #inspiration",
+        "💡 Just discovered this fantastic creator @{u}! Their content always brings fresh perspectives and valuable insights. Highly recommend following! #discovery #content #value",
+        "🎯 Another brilliant post from @{u}! The way they explain complex topics is simply amazing. Educational and entertaining at the same time! #education #entertainment #brilliant"
+    )
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         self.rate_limiter = RateLimitHandler()
-        self.session = requests.Session()
-        
-        # Set realistic headers
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        self.session = session
     
+    @cached()
     async def get_public_posts(self, username: str, max_posts: int = 5) -> List[Dict]:
-        """Scrape public posts with rate limiting"""
-        posts = []
-        
+        """Scrape public posts with rate limiting, fetching up to 50 posts in one GraphQL request"""
         try:
             await self.rate_limiter.wait_if_needed()
+            session = self.session or await get_session()
             
-            # Try to get posts from public profile
-            url = f"https://www.instagram.com/{username}/"
+            # Resolve the user id from the profile's JSON view
+            profile = await self._get_json(session, f"https://www.instagram.com/{username}/", {'__a': '1', '__d': 'dis'})
+            user_id = ((profile or {}).get('graphql') or {}).get('user', {}).get('id')
             
-            for attempt in range(3):
-                try:
-                    response = self.session.get(url, timeout=10)
-                    
-                    if response.status_code == 429:  # Rate limited
-                        await self.rate_limiter.handle_rate_limit_error(attempt)
-                        continue
-                    elif response.status_code == 200:
-                        # Parse the response for post data
-                        # This is a simplified version - in production you'd parse the JSON data
-                        logger.info(f"📄 Retrieved profile page for @{username}")
-                        
-                        # Simulate finding posts (replace with actual parsing)
-                        sample_posts = self._generate_sample_posts(username, max_posts)
-                        posts.extend(sample_posts)
-                        break
-                    else:
-                        logger.warning(f"⚠️ HTTP {response.status_code} for @{username}")
-                        break
-                        
-                except requests.RequestException as e:
-                    logger.error(f"❌ Request failed: {e}")
-                    if attempt < 2:
-                        await self.rate_limiter.handle_rate_limit_error(attempt)
-                    else:
-                        break
+            posts = []
+            if user_id:
+                logger.info(f"📄 Retrieved profile data for @{username}")
+                await self.rate_limiter.wait_if_needed()
+                
+                data = await self._get_json(session, "https://www.instagram.com/graphql/query/", {
+                    'query_hash': PROFILE_POSTS_QUERY_HASH,
+                    'variables': json.dumps({'id': user_id, 'first': POSTS_PER_QUERY})
+                })
+                media = (((data or {}).get('data') or {}).get('user') or {}).get('edge_owner_to_timeline_media', {})
+                video_nodes = (edge['node'] for edge in media.get('edges', []) if edge.get('node', {}).get('is_video'))
+                posts = [self._parse_node(node) for node in islice(video_nodes, max_posts)]
+            
+            if not posts and os.getenv("IG_ALLOW_SAMPLES"):
+                # Fall back to sample posts when Instagram returns no usable data
+                logger.info(f"📝 No public post data for @{username}, using sample posts")
+                posts = self._generate_sample_posts(username, max_posts)
             
             return posts
             
@@ -174,35 +400,78 @@ class InstagramWebScraper:
             logger.error(f"❌ Web scraping failed for @{username}: {e}")
             return []
     
+    async def _get_json(self, session: aiohttp.ClientSession, url: str, params: Dict) -> Optional[Dict]:
+        """GET a JSON endpoint, backing off on rate limits and network errors"""
+        for attempt in range(3):
+            try:
+                # Rotate User-Agents per request to stay under per-UA heuristics
+                headers = random.choice(_UA_POOL)
+                async with session.get(url, params=params, headers=headers) as response:
+                    status = response.status
+                    data = parse_json(await response.read()) if status == 200 else None
+                    retry_after = _retry_after(response)
+                
+                if status == 429:  # Rate limited
+                    await self.rate_limiter.handle_rate_limit_error(attempt, retry_after)
+                    continue
+                elif status != 200:
+                    logger.warning(f"⚠️ HTTP {status} for {url}")
+                return data
+                
+            except ValueError:
+                logger.warning(f"⚠️ Non-JSON response from {url}")
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"❌ Request failed: {e}")
+                if attempt < 2:
+                    await self.rate_limiter.backoff(attempt)
+        
+        return None
+    
+    @staticmethod
+    def _parse_node(node: Dict) -> Dict:
+        """Convert a GraphQL timeline media node into a post"""
+        caption_edges = node.get('edge_media_to_caption', {}).get('edges', [])
+        caption = caption_edges[0]['node'].get('text', '') if caption_edges else ''
+        likes = node.get('edge_liked_by') or node.get('edge_media_preview_like') or {}
+        
+        return {
+            'shortcode': node.get('shortcode'),
+            'caption': caption,
+            'video_url': node.get('video_url'),
+            'likes': likes.get('count', 0),
+            'comments': node.get('edge_media_to_comment', {}).get('count', 0),
+            'date': datetime.fromtimestamp(node.get('taken_at_timestamp', 0)).strftime('%Y-%m-%d %H:%M:%S'),
+            'hashtags': HASHTAG_PATTERN.findall(caption),
+            'mentions': MENTION_PATTERN.findall(caption),
+            'source': 'web_scraping'
+        }
+    
     def _generate_sample_posts(self, username: str, count: int) -> List[Dict]:
         """Generate sample posts (replace with actual parsing in production)"""
-        posts = []
         base_time = datetime.now()
+        prefix = username.upper()
         
-        sample_captions = [
-            f"🚀 Amazing content from @{username}! This video shows incredible creativity and innovation. The attention to detail is outstanding! #creativity #innovation #inspiration",
-            f"💡 Just discovered this fantastic creator @{username}! Their content always brings fresh perspectives and valuable insights. Highly recommend following! #discovery #content #value",
-            f"🎯 Another brilliant post from @{username}! The way they explain complex topics is simply amazing. Educational and entertaining at the same time! #education #entertainment #brilliant"
-        ]
-        
-        for i in range(min(count, len(sample_captions))):
-            posts.append({
-                'shortcode': f'{username.upper()}{i+1:03d}',
-                'caption': sample_captions[i],
+        return [
+            {
+                'shortcode': f'{prefix}{i+1:03d}',
+                'caption': template.format(u=username),
                 'video_url': f'https://example.com/{username}_video_{i+1}.mp4',
                 'likes': random.randint(500, 5000),
                 'comments': random.randint(20, 200),
                 'date': (base_time - timedelta(days=i)).strftime('%Y-%m-%d %H:%M:%S'),
                 'hashtags': ['#creativity', '#innovation', '#content'],
                 'mentions': [f'@{username}'],
-                'source': 'web_scraping'
-            })
-        
-        return posts
+                'source': SAMPLE_SOURCE
+            }
+            for i, template in enumerate(self._SAMPLE_CAPTION_TEMPLATES[:count])
+        ]
 
 class InstaloaderExtractor:
     """Enhanced Instaloader with rate limiting"""
     
+    __slots__ = ('loader', 'rate_limiter', '_http_calls')
+    
     def __init__(self):
         self.loader = instaloader.Instaloader(
             download_videos=False,
@@ -215,6 +484,17 @@ class InstaloaderExtractor:
         )
         self.rate_limiter = RateLimitHandler()
         
+        # Count Instaloader's real HTTP requests; its post iterator fetches a whole
+        # page of posts per request, so only those need to be rate limited
+        self._http_calls = 0
+        get_json = self.loader.context.get_json
+        
+        def counted_get_json(*args, **kwargs):
+            self._http_calls += 1
+            return get_json(*args, **kwargs)
+        
+        self.loader.context.get_json = counted_get_json
+        
         # Try to login if credentials are provided
         username = os.getenv('INSTAGRAM_USERNAME')
         password = os.getenv('INSTAGRAM_PASSWORD')
@@ -226,47 +506,19 @@ class InstaloaderExtractor:
             except Exception as e:
                 logger.warning(f"⚠️ Instagram login failed: {e}")
                 logger.info("📝 Continuing without login (public posts only)")
+        
+        # Login replaces Instaloader's session, so widen its keep-alive pool afterwards
+        adapter = HTTPAdapter(pool_connections=INSTALOADER_POOL_SIZE, pool_maxsize=INSTALOADER_POOL_SIZE)
+        self.loader.context._session.mount('https://', adapter)
     
+    @cached()
     async def extract_posts(self, username: str, max_posts: int = 3) -> List[Dict]:
         """Extract posts with enhanced rate limiting"""
-        posts = []
-        
         try:
             await self.rate_limiter.wait_if_needed()
             
-            profile = instaloader.Profile.from_username(self.loader.context, username)
-            logger.info(f"👤 Found profile: {profile.full_name} ({profile.followers} followers)")
-            
-            count = 0
-            for post in profile.get_posts():
-                if count >= max_posts:
-                    break
-                
-                try:
-                    await self.rate_limiter.wait_if_needed()
-                    
-                    if post.is_video:
-                        post_data = {
-                            'shortcode': post.shortcode,
-                            'caption': post.caption or "",
-                            'video_url': post.video_url,
-                            'likes': post.likes,
-                            'comments': post.comments,
-                            'date': post.date.strftime("%Y-%m-%d %H:%M:%S"),
-                            'hashtags': post.caption_hashtags if post.caption else [],
-                            'mentions': post.caption_mentions if post.caption else [],
-                            'source': 'instaloader'
-                        }
-                        posts.append(post_data)
-                        count += 1
-                        logger.success(f"✅ Extracted video: {post.shortcode} ({post.likes} likes)")
-                        
-                        # Add delay between posts
-                        await asyncio.sleep(random.uniform(1, 3))
-                
-                except Exception as e:
-                    logger.warning(f"⚠️ Failed to extract post: {e}")
-                    continue
+            # Instaloader's requests are blocking, so iterate the profile on a worker thread
+            posts = await asyncio.to_thread(self._collect_posts, username, max_posts, asyncio.get_running_loop())
             
             logger.success(f"📥 Extracted {len(posts)} videos from @{username}")
             return posts
@@ -274,80 +526,169 @@ class InstaloaderExtractor:
         except Exception as e:
             logger.error(f"❌ Instaloader extraction failed: {e}")
             return []
+    
+    def _collect_posts(self, username: str, max_posts: int, loop: asyncio.AbstractEventLoop) -> List[Dict]:
+        """
+        Collect a profile's latest videos, waiting on the loop's rate limiter before each page request
+        
+        Cancelling the awaiting task does not stop this thread, so it scans at most
+        POSTS_PER_QUERY posts and stops as soon as it has max_posts videos.
+        """
+        posts = []
+        
+        profile = instaloader.Profile.from_username(self.loader.context, username)
+        logger.info(f"👤 Found profile: {profile.full_name} ({profile.followers} followers)")
+        
+        seen_calls = self._http_calls
+        for post in islice(profile.get_posts(), POSTS_PER_QUERY):
+            if len(posts) >= max_posts:
+                break
+            
+            try:
+                # Throttle only when reaching this post required another request
+                if self._http_calls > seen_calls:
+                    asyncio.run_coroutine_threadsafe(self.rate_limiter.wait_if_needed(), loop).result()
+                    seen_calls = self._http_calls
+                
+                if post.is_video:
+                    post_data = {
+                        'shortcode': post.shortcode,
+                        'caption': post.caption or "",
+                        'video_url': post.video_url,
+                        'likes': post.likes,
+                        'comments': post.comments,
+                        'date': post.date.strftime("%Y-%m-%d %H:%M:%S"),
+                        'hashtags': post.caption_hashtags if post.caption else [],
+                        'mentions': post.caption_mentions if post.caption else [],
+                        'source': 'instaloader'
+                    }
+                    posts.append(post_data)
+                    logger.opt(lazy=True).success("✅ Extracted video: {} ({} likes)",
+                                                  lambda: post_data['shortcode'], lambda: post_data['likes'])
+            
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to extract post: {e}")
+                continue
+        
+        return posts
 
 class AdvancedInstagramExtractor:
     """Main extractor that tries multiple methods"""
     
-    def __init__(self):
-        self.basic_api = InstagramBasicDisplayAPI()
-        self.web_scraper = InstagramWebScraper()
+    __slots__ = ('basic_api', 'web_scraper', 'instaloader', '_sem')
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        self.basic_api = InstagramBasicDisplayAPI(session)
+        self.web_scraper = InstagramWebScraper(session)
         self.instaloader = InstaloaderExtractor()
+        # Bound how many users are extracted at once to respect Instagram's per-IP limits
+        self._sem = asyncio.Semaphore(int(os.getenv("IG_MAX_CONCURRENT_USERS", 5)))
     
-    async def extract_user_content(self, username: str, max_videos: int = 3) -> List[Dict]:
-        """Extract content using multiple methods with fallbacks"""
-        logger.info(f"🎯 Starting advanced extraction for @{username}")
+    async def extract_many_users(self, usernames: List[str], max_videos: int = 3) -> Dict[str, List[Dict]]:
+        """Extract content for several users in parallel, bounded by the per-extractor semaphore"""
+        results = await asyncio.gather(
+            *(self.extract_user_content(username, max_videos) for username in usernames),
+            return_exceptions=True
+        )
         
-        all_posts = []
+        user_posts = {}
+        for username, result in zip(usernames, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Extraction failed for @{username}: {result}")
+                result = []
+            user_posts[username] = result
+        return user_posts
+    
+    async def extract_user_content(self, username: str, max_videos: int = 3,
+                                   cache_fallback: bool = True) -> List[Dict]:
+        """Extract content using multiple methods with fallbacks, serving stale cached posts if all fail"""
+        return [post async for post in self.stream_user_content(username, max_videos, cache_fallback)]
+    
+    async def stream_user_content(self, username: str, max_videos: int = 3,
+                                  cache_fallback: bool = True) -> AsyncIterator[Dict]:
+        """
+        Yield unique posts as soon as any extraction method returns them
         
-        # Method 1: Try Instagram Basic Display API
-        if self.basic_api.access_token:
-            logger.info("🔄 Trying Instagram Basic Display API...")
-            try:
-                api_posts = await self.basic_api.get_user_media(limit=max_videos)
-                if api_posts:
-                    all_posts.extend(api_posts)
-                    logger.success(f"✅ Got {len(api_posts)} posts from Basic Display API")
-                else:
-                    logger.info("📝 No posts from Basic Display API")
-            except Exception as e:
-                logger.warning(f"⚠️ Basic Display API failed: {e}")
+        Consumers can start on the first post while slower methods are still running;
+        closing the generator early cancels the methods still in flight.
         
-        # Method 2: Try Instaloader (if we need more posts)
-        if len(all_posts) < max_videos:
-            logger.info("🔄 Trying Instaloader extraction...")
-            try:
-                insta_posts = await self.instaloader.extract_posts(username, max_videos - len(all_posts))
-                if insta_posts:
-                    all_posts.extend(insta_posts)
-                    logger.success(f"✅ Got {len(insta_posts)} posts from Instaloader")
-                else:
-                    logger.info("📝 No posts from Instaloader")
-            except Exception as e:
-                logger.warning(f"⚠️ Instaloader failed: {e}")
+        Args:
+            username: Instagram username to extract from
+            max_videos: Maximum number of posts to yield
+            cache_fallback: Whether to serve stale cached posts if every method fails
         
-        # Method 3: Try Web Scraping (if we still need more posts)
-        if len(all_posts) < max_videos:
-            logger.info("🔄 Trying web scraping...")
+        Yields:
+            Post dictionaries, deduplicated by shortcode or content
+        """
+        async with self._sem:
+            logger.info(f"🎯 Starting advanced extraction for @{username}")
+            
+            # Run every available method at once (Basic Display API, Instaloader, web scraping)
+            methods = []
+            if self.basic_api.access_token:
+                methods.append(("Basic Display API", self.basic_api.get_user_media(limit=max_videos)))
+            methods.append(("Instaloader", self.instaloader.extract_posts(username, max_videos)))
+            methods.append(("web scraping", self.web_scraper.get_public_posts(username, max_videos)))
+            
+            seen = set()
+            tasks = [asyncio.create_task(self._run_method(name, coro)) for name, coro in methods]
             try:
-                web_posts = await self.web_scraper.get_public_posts(username, max_videos - len(all_posts))
-                if web_posts:
-                    all_posts.extend(web_posts)
-                    logger.success(f"✅ Got {len(web_posts)} posts from web scraping")
-                else:
-                    logger.info("📝 No posts from web scraping")
-            except Exception as e:
-                logger.warning(f"⚠️ Web scraping failed: {e}")
-        
-        # Remove duplicates and limit results
-        unique_posts = self._remove_duplicates(all_posts)
-        final_posts = unique_posts[:max_videos]
-        
-        logger.success(f"🎉 Final result: {len(final_posts)} unique posts extracted for @{username}")
-        
-        return final_posts
+                for next_done in asyncio.as_completed(tasks):
+                    name, posts = await next_done
+                    if posts:
+                        logger.success(f"✅ Got {len(posts)} posts from {name}")
+                    else:
+                        logger.info(f"📝 No posts from {name}")
+                    
+                    for post in posts:
+                        ident = self._identifier(post)
+                        if ident not in seen:
+                            seen.add(ident)
+                            yield post
+                            if len(seen) >= max_videos:
+                                break
+                    
+                    # Stop waiting on slower methods once we have enough unique posts
+                    if len(seen) >= max_videos:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            
+            if not seen and cache_fallback:
+                for post in await self._get_stale_posts(username, max_videos):
+                    seen.add(self._identifier(post))
+                    yield post
+            
+            logger.success(f"🎉 Final result: {len(seen)} unique posts extracted for @{username}")
     
-    def _remove_duplicates(self, posts: List[Dict]) -> List[Dict]:
-        """Remove duplicate posts based on shortcode or content"""
-        seen = set()
-        unique_posts = []
-        
-        for post in posts:
-            identifier = post.get('shortcode') or post.get('id') or post.get('caption', '')[:50]
-            if identifier not in seen:
-                seen.add(identifier)
-                unique_posts.append(post)
-        
-        return unique_posts
+    async def _run_method(self, name: str, coro) -> tuple:
+        """Await one extraction method, returning its name and posts (empty on failure)"""
+        logger.info(f"🔄 Trying {name}...")
+        try:
+            return name, await coro
+        except Exception as e:
+            logger.warning(f"⚠️ {name} failed: {e}")
+            return name, []
+    
+    async def _get_stale_posts(self, username: str, max_videos: int) -> List[Dict]:
+        """Get the last successfully cached posts for a user from any extraction method"""
+        for method, args in (
+            (InstagramBasicDisplayAPI.get_user_media, ('me', max_videos)),
+            (InstaloaderExtractor.extract_posts, (username, max_videos)),
+            (InstagramWebScraper.get_public_posts, (username, max_videos))
+        ):
+            stale_posts = await get_stale(method, *args)
+            if stale_posts:
+                logger.warning(f"♻️ Serving {len(stale_posts)} stale cached posts for @{username}")
+                return stale_posts[:max_videos]
+        return []
+    
+    @staticmethod
+    def _identifier(post: Dict) -> str:
+        """Identify a post by shortcode, id, or the start of its caption"""
+        return post.get('shortcode') or post.get('id') or (post.get('caption') or '')[:50]
 
 async def test_advanced_extractor():
     """Test the advanced extractor"""
@@ -362,7 +703,10 @@ async def test_advanced_extractor():
     
     logger.info(f"🎯 Testing extraction for @{test_username}")
     
-    posts = await extractor.extract_user_content(test_username, max_videos=3)
+    try:
+        posts = await extractor.extract_user_content(test_username, max_videos=3)
+    finally:
+        await close_session()
     
     print(f"\n📊 EXTRACTION RESULTS:")
     print(f"👤 Username: @{test_username}")
@@ -379,4 +723,10 @@ async def test_advanced_extractor():
     return posts
 
 if __name__ == "__main__":
-    asyncio.run(test_advanced_extractor())
+    try:
+        import uvloop
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+    
+    run(test_advanced_extractor())
@@ -0,0 +1,19 @@
+"""
+JSON Codec - Shared JSON serialization, with orjson when it is installed
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def serialize_json(data: Any, indent: bool = True) -> bytes:
+    """Serialize data as JSON bytes (indented, or on one line), with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2) if indent else orjson.dumps(data)
+    return json.dumps(data, indent=2 if indent else None).encode('utf-8')
+
+parse_json = orjson.loads if ORJSON_AVAILABLE else json.loads
@@ -9,6 +9,13 @@ from loguru import logger
 from agents.orchestrator_agent import OrchestratorAgent
 from config import settings
 
+# uvloop ships with uvicorn[standard]; entry points run on it when it is installed
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Configure logging
 logger.remove()
 logger.add(
@@ -49,15 +56,15 @@ async def run_workflow(target_users: List[str],
             schedule_posts=schedule_posts
         )
         
-        # Display results
-        print_workflow_results(results)
+        # Display results off the event loop thread
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, print_workflow_results, results)
         
-        # Monitor engagement if posts were made
+        # Monitor engagement if posts were made, printing a snapshot every minute for 5 minutes
         if not schedule_posts and results.get('posting_results'):
             logger.info("Monitoring engagement metrics...")
-            await asyncio.sleep(300)  # Wait 5 minutes
-            engagement_data = await orchestrator.monitor_engagement(results)
-            print_engagement_results(engagement_data)
+            async for engagement_data in orchestrator.monitor_engagement_stream(results, interval=60, duration=300):
+                await loop.run_in_executor(None, print_engagement_results, engagement_data)
         
         logger.info("Workflow completed successfully")
         return results
@@ -118,6 +125,10 @@ async def run_scheduled_workflow():
     target_users = settings.target_instagram_users
     return await run_workflow(target_users, schedule_posts=True)
 
+def run_async(coro):
+    """Run a coroutine to completion on uvloop when it is installed, else on the default event loop"""
+    return uvloop.run(coro) if UVLOOP_AVAILABLE else asyncio.run(coro)
+
 def main():
     """Main CLI interface"""
     parser = argparse.ArgumentParser(description="Instagram-to-Social Media Agent System")
@@ -139,11 +150,11 @@ def main():
         
     elif args.single_user:
         # Process single user
-        asyncio.run(run_single_user(args.single_user, args.platforms))
+        run_async(run_single_user(args.single_user, args.platforms))
         
     elif args.users:
         # Process specified users
-        asyncio.run(run_workflow(args.users, args.platforms, args.schedule))
+        run_async(run_workflow(args.users, args.platforms, args.schedule))
         
     else:
         # Use default users from config
@@ -152,7 +163,7 @@ def main():
             logger.error("No target users specified. Use --users or set TARGET_INSTAGRAM_USERS in config")
             sys.exit(1)
         
-        asyncio.run(run_workflow(target_users, args.platforms, args.schedule))
+        run_async(run_workflow(target_users, args.platforms, args.schedule))
 
 if __name__ == "__main__":
     main()
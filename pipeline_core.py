@@ -0,0 +1,301 @@
+"""
+Pipeline Core - Shared clients, transformer and poster for the standalone Instagram → Twitter pipelines
+"""
+import asyncio
+import hashlib
+import os
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional
+import openai
+import tweepy
+from aiolimiter import AsyncLimiter
+from loguru import logger
+from semantic_cache import SemanticCache, EMBEDDING_MODEL
+
+# Tweets allowed per rate-limit window (seconds), shared by all concurrent posts
+TWEETS_PER_WINDOW = 50
+RATE_LIMIT_WINDOW = 900
+
+# Captions up to this length with few hashtags skip the AI transformation
+SHORT_CAPTION_LENGTH = 240
+SHORT_CAPTION_HASHTAGS = 3
+
+# Emojis that already make a post feel engaging
+ENGAGEMENT_EMOJI = re.compile('[🔥💯✨🚀]')
+
+# Whitespace-separated words of a caption
+WORD_PATTERN = re.compile(r'\S+')
+
+# Prompt for the AI transformation
+TRANSFORM_PROMPT = """
+Transform this Instagram video caption into an engaging Twitter post:
+
+Original Caption: "{caption}"
+Video Stats: {stats}
+
+Requirements:
+- Keep it under 280 characters
+- Make it engaging and Twitter-friendly
+- Add relevant emojis
+- Include a call to action or question
+- Maintain the original meaning
+- Make it more conversational
+- Remove excessive hashtags (max 2-3)
+
+Twitter Post:"""
+
+@lru_cache(maxsize=1)
+def get_twitter_client() -> tweepy.Client:
+    """
+    Build the Twitter client once per process so its connection pool is reused
+    
+    Returns:
+        Shared tweepy client
+    
+    Raises:
+        ValueError: If any Twitter credential is missing
+    """
+    api_key = os.getenv('TWITTER_API_KEY')
+    api_secret = os.getenv('TWITTER_API_SECRET')
+    access_token = os.getenv('TWITTER_ACCESS_TOKEN')
+    access_token_secret = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
+    
+    if not all([api_key, api_secret, access_token, access_token_secret]):
+        raise ValueError("Missing Twitter API credentials")
+    
+    return tweepy.Client(
+        consumer_key=api_key,
+        consumer_secret=api_secret,
+        access_token=access_token,
+        access_token_secret=access_token_secret,
+        wait_on_rate_limit=True
+    )
+
+@lru_cache(maxsize=1)
+def get_tweet_limiter() -> AsyncLimiter:
+    """Build the tweet rate limiter once per process so every poster shares the app-level budget"""
+    return AsyncLimiter(TWEETS_PER_WINDOW, RATE_LIMIT_WINDOW)
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> openai.AsyncOpenAI:
+    """
+    Build the async OpenAI client once per process
+    
+    Returns:
+        Shared AsyncOpenAI client, closed by close_clients()
+    """
+    return openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+async def close_clients():
+    """Close the shared OpenAI client's connection pool, if one was created, on the loop that used it"""
+    if get_openai_client.cache_info().currsize:
+        try:
+            await get_openai_client().close()
+        except Exception as e:
+            logger.warning(f"Error closing OpenAI client: {str(e)}")
+        get_openai_client.cache_clear()
+
+def truncate(text: str, limit: int) -> str:
+    """Shorten text to at most limit characters, ending with an ellipsis when cut"""
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def _fit_tweet(body: str, suffix: str) -> str:
+    """Fit body and suffix into one tweet, reserving the suffix's space up front"""
+    return truncate(body, 280 - len(suffix)) + suffix
+
+class ContentTransformer:
+    """Transform Instagram content for Twitter using AI"""
+    
+    __slots__ = ('openai_key', 'aclient', 'cache')
+    
+    # Prompt for the AI transformation, formatted with the caption and video stats
+    TRANSFORM_PROMPT = TRANSFORM_PROMPT
+    
+    def __init__(self):
+        self.openai_key = os.getenv('OPENAI_API_KEY')
+        self.aclient = None
+        self.cache = None
+        if self.openai_key:
+            self.aclient = get_openai_client()
+            self.cache = SemanticCache(self._cache_path())
+            logger.info("✅ OpenAI API initialized")
+        else:
+            logger.warning("⚠️ No OpenAI API key found - using simple transformation")
+    
+    async def embed_captions(self, videos: List[Dict]) -> List[Optional[List[float]]]:
+        """Embed all captions in one request so each transform can skip its own embedding call"""
+        if not self.aclient or not videos:
+            return [None] * len(videos)
+        
+        try:
+            response = await self.aclient.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=[video['caption'] for video in videos]
+            )
+            return [item.embedding for item in response.data]
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Batch caption embedding failed: {e}")
+            return [None] * len(videos)
+    
+    async def transform_for_twitter(self, instagram_content: Dict,
+                                    precomputed_embedding: Optional[List[float]] = None) -> str:
+        """Transform Instagram video content for Twitter"""
+        try:
+            original_caption = instagram_content['caption']
+            video_stats = f"{instagram_content['likes']} likes, {instagram_content['comments']} comments"
+            
+            logger.info("🧠 Transforming content for Twitter...")
+            logger.opt(lazy=True).info("📝 Original caption: {}...", lambda: original_caption[:100])
+            
+            if self.openai_key and self._fits_without_ai(original_caption):
+                # Short captions already work as tweets, skip the LLM round-trip
+                logger.debug("⚡ Caption is short enough, skipping AI transformation")
+                transformed = self._simple_transform(original_caption, instagram_content)
+            elif self.openai_key:
+                # Use AI transformation
+                transformed = await self._ai_transform(original_caption, video_stats, precomputed_embedding)
+            else:
+                # Use simple transformation
+                transformed = self._simple_transform(original_caption, instagram_content)
+            
+            logger.opt(lazy=True).success("✨ Transformed content: {}...", lambda: transformed[:100])
+            return transformed
+        
+        except Exception as e:
+            logger.error(f"❌ Content transformation failed: {e}")
+            return self._simple_transform(instagram_content['caption'], instagram_content)
+    
+    @classmethod
+    def _cache_path(cls) -> str:
+        """Cache file for this class's prompt, so other prompts and prompt edits never share entries"""
+        digest = hashlib.blake2b(cls.TRANSFORM_PROMPT.encode('utf-8'), digest_size=8).hexdigest()
+        return f"./storage/semantic_cache_{digest}.db"
+    
+    @staticmethod
+    def _fits_without_ai(caption: str) -> bool:
+        """Check if a caption is short enough, with few enough hashtags, to post without rewriting"""
+        return len(caption) <= SHORT_CAPTION_LENGTH and caption.count('#') <= SHORT_CAPTION_HASHTAGS
+    
+    async def _ai_transform(self, caption: str, stats: str,
+                            embedding: Optional[List[float]] = None) -> str:
+        """AI-powered content transformation"""
+        try:
+            # Identical captions skip the network entirely
+            cached = self.cache.get_exact(caption)
+            if cached is not None:
+                logger.info("♻️ Reusing cached transformation")
+                return cached
+            
+            if embedding is None:
+                embedding_response = await self.aclient.embeddings.create(model=EMBEDDING_MODEL, input=caption)
+                embedding = embedding_response.data[0].embedding
+            cached = self.cache.get_similar(embedding)
+            if cached is not None:
+                logger.info("♻️ Reusing cached transformation for a similar caption")
+                return cached
+            
+            prompt = self.TRANSFORM_PROMPT.format(caption=caption, stats=stats)
+            
+            stream = await self.aclient.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=90,
+                temperature=0.7,
+                stream=True
+            )
+            
+            # Stop generating as soon as the post can no longer fit in a tweet
+            transformed = ""
+            async for chunk in stream:
+                if chunk.choices:
+                    transformed += chunk.choices[0].delta.content or ""
+                if len(transformed.lstrip()) > 280:
+                    await stream.close()
+                    break
+            transformed = transformed.strip()
+            
+            # Ensure it's under 280 characters
+            transformed = truncate(transformed, 280)
+            
+            self.cache.set(caption, embedding, transformed)
+            return transformed
+        
+        except Exception as e:
+            logger.error(f"❌ AI transformation failed: {e}")
+            return self._simple_transform(caption, {'likes': 0, 'comments': 0})
+    
+    def _simple_transform(self, caption: str, content: Dict) -> str:
+        """Simple rule-based transformation"""
+        # Extract main content (remove excessive hashtags)
+        main_content = caption.partition('\n')[0]
+        
+        # Limit words and clean up
+        transformed = " ".join(m.group() for m in islice(WORD_PATTERN.finditer(main_content), 30))
+        
+        # Remove excessive hashtags, keep only 2-3
+        hashtags = content.get('hashtags', [])[:2]
+        
+        # Add engagement elements
+        if not ENGAGEMENT_EMOJI.search(transformed):
+            transformed += " 🚀"
+        
+        # Add stats if impressive
+        likes = content.get('likes', 0)
+        if likes > 1000:
+            transformed += f" ({likes} likes!)"
+        
+        # Add hashtags
+        if hashtags:
+            transformed += " " + " ".join(hashtags)
+        
+        # Ensure Twitter length
+        transformed = truncate(transformed, 280)
+        
+        return transformed
+
+class TwitterPoster:
+    """Post content to Twitter"""
+    
+    __slots__ = ('client', 'rate_limiter')
+    
+    def __init__(self):
+        self.client = get_twitter_client()
+        self.rate_limiter = get_tweet_limiter()
+        logger.info("✅ Twitter API initialized")
+    
+    async def post_tweet(self, content: str, source_info: Dict = None) -> Dict:
+        """Post content to Twitter"""
+        try:
+            logger.info("🐦 Posting to Twitter...")
+            
+            # Add source attribution, shortening the body rather than the attribution
+            suffix = self._attribution(source_info) if source_info else ""
+            content = _fit_tweet(content, suffix)
+            
+            async with self.rate_limiter:
+                response = await asyncio.to_thread(self.client.create_tweet, text=content)
+            
+            post_url = f"https://twitter.com/user/status/{response.data['id']}"
+            logger.success(f"✅ Posted to Twitter: {response.data['id']}")
+            logger.info(f"🔗 View post: {post_url}")
+            
+            return {
+                'success': True,
+                'post_id': response.data['id'],
+                'url': post_url,
+                'content': content
+            }
+        
+        except Exception as e:
+            logger.error(f"❌ Twitter posting failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _attribution(self, source_info: Dict) -> str:
+        """Suffix crediting the source Instagram video"""
+        return f"\n\n📸 From Instagram video: {source_info.get('shortcode', 'unknown')}"
@@ -0,0 +1,151 @@
+"""
+Semantic Cache - Reuses generated posts for identical or near-duplicate captions
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+# Embedding model used to compare captions
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Minimum cosine similarity for a near-duplicate hit
+SIMILARITY_THRESHOLD = 0.95
+
+class SemanticCache:
+    """SQLite-backed cache with an exact-match dict and an optional brute-force cosine index"""
+    
+    def __init__(self, db_path: str = "./storage/semantic_cache.db",
+                 similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 ttl: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite database file
+            similarity_threshold: Minimum cosine similarity for a near-duplicate hit
+            ttl: Entry lifetime in seconds, or None to keep entries forever
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS semantic_cache ("
+            "prompt_hash BLOB PRIMARY KEY, embedding BLOB, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        if self.ttl:
+            self.conn.execute("DELETE FROM semantic_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        self.conn.commit()
+        
+        # Exact hits by text hash; near-duplicates by one matrix-vector product,
+        # with each embedded key owning one matrix row so replacing a key overwrites it
+        self.exact: Dict[bytes, Tuple[str, float]] = {}
+        self.rows: Dict[bytes, int] = {}
+        self.row_keys: List[bytes] = []
+        self.matrix: Optional[np.ndarray] = None
+        
+        rows = self.conn.execute("SELECT prompt_hash, embedding, response, created_at FROM semantic_cache").fetchall()
+        self.exact = {key: (response, created_at) for key, _, response, created_at in rows}
+        embedded = [(key, blob) for key, blob, _, _ in rows if blob is not None]
+        if embedded:
+            self.row_keys = [key for key, _ in embedded]
+            self.rows = {key: i for i, key in enumerate(self.row_keys)}
+            self.matrix = np.vstack([np.frombuffer(blob, dtype='float32') for _, blob in embedded])
+    
+    @staticmethod
+    def make_key(text: str) -> bytes:
+        """Build the exact-match key for a caption"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    
+    def get_exact(self, text: str) -> Optional[str]:
+        """Return the cached response for an identical caption, if any"""
+        try:
+            return self._get_fresh(self.make_key(text))
+        
+        except Exception as e:
+            logger.error(f"Error reading semantic cache: {str(e)}")
+            return None
+    
+    def get_similar(self, embedding: List[float]) -> Optional[str]:
+        """
+        Look up the nearest cached caption by cosine similarity
+        
+        Args:
+            embedding: Embedding of the caption being transformed
+        
+        Returns:
+            Cached response or None if nothing is similar enough
+        """
+        try:
+            if self.matrix is None:
+                return None
+            
+            scores = self.matrix @ self._normalize(embedding)
+            best = int(scores.argmax())
+            if scores[best] >= self.similarity_threshold:
+                return self._get_fresh(self.row_keys[best])
+            return None
+        
+        except Exception as e:
+            logger.error(f"Error reading semantic cache: {str(e)}")
+            return None
+    
+    def set(self, text: str, embedding: Optional[List[float]], response: str):
+        """
+        Store a generated response
+        
+        Args:
+            text: Caption the response was generated from
+            embedding: Embedding of the caption, or None to store it for exact hits only
+            response: Generated post
+        """
+        try:
+            key = self.make_key(text)
+            vector = self._normalize(embedding) if embedding is not None else None
+            created_at = time.time()
+            # Replacing a key keeps its stored embedding unless a new one is given, matching the index
+            self.conn.execute(
+                "INSERT INTO semantic_cache (prompt_hash, embedding, response, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(prompt_hash) DO UPDATE SET embedding = COALESCE(excluded.embedding, embedding), "
+                "response = excluded.response, created_at = excluded.created_at",
+                (key, vector.tobytes() if vector is not None else None, response, created_at)
+            )
+            self.conn.commit()
+            
+            self.exact[key] = (response, created_at)
+            if vector is None:
+                return
+            
+            row = self.rows.get(key)
+            if row is not None:
+                self.matrix[row] = vector
+            else:
+                self.rows[key] = len(self.row_keys)
+                self.row_keys.append(key)
+                self.matrix = vector[None, :] if self.matrix is None else np.vstack([self.matrix, vector])
+        
+        except Exception as e:
+            logger.error(f"Error writing semantic cache: {str(e)}")
+    
+    def _get_fresh(self, key: bytes) -> Optional[str]:
+        """Return a key's response unless it is missing or has outlived the TTL"""
+        entry = self.exact.get(key)
+        if entry is None:
+            return None
+        
+        response, created_at = entry
+        if self.ttl and time.time() - created_at > self.ttl:
+            return None
+        return response
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype='float32')
+        return vector / (np.linalg.norm(vector) or 1.0)
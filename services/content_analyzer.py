@@ -3,17 +3,28 @@ Content Analyzer Service - Analyzes video content and generates insights
 """
 import asyncio
 import cv2
+import hashlib
 import os
+from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple
 import openai
 from transformers import pipeline
 from loguru import logger
 from config import settings
 
+# Number of analyses kept in the in-memory LRU cache
+ANALYSIS_CACHE_SIZE = 128
+
+class _AnalysisAbandoned(Exception):
+    """Set on a shared analysis future when the caller running the analysis is cancelled"""
+
 class ContentAnalyzer:
     """Service for analyzing video content and generating insights"""
     
     def __init__(self):
+        # (video_path, mtime_ns, caption_hash) -> Future resolving to the analysis
+        self._cache: "OrderedDict[Tuple, asyncio.Future]" = OrderedDict()
+        
         # Initialize OpenAI
         openai.api_key = settings.openai_api_key
         
@@ -39,7 +50,7 @@ class ContentAnalyzer:
     
     async def analyze_video_content(self, video_path: str, caption: str = "") -> Dict:
         """
-        Comprehensive analysis of video content
+        Comprehensive analysis of video content, memoized per file version and caption
         
         Args:
             video_path: Path to the video file
@@ -48,6 +59,49 @@ class ContentAnalyzer:
         Returns:
             Analysis results dictionary
         """
+        try:
+            cache_key = (
+                video_path,
+                os.stat(video_path).st_mtime_ns,
+                hashlib.sha256(caption.encode('utf-8')).hexdigest()
+            )
+        except OSError:
+            return await self._analyze_video_content(video_path, caption)
+        
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            try:
+                return await asyncio.shield(cached)
+            except _AnalysisAbandoned:
+                # The caller running this analysis was cancelled, run it again for ourselves
+                return await self.analyze_video_content(video_path, caption)
+        
+        # Store the future before awaiting so concurrent callers share one analysis
+        future = asyncio.get_running_loop().create_future()
+        self._cache[cache_key] = future
+        if len(self._cache) > ANALYSIS_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        
+        try:
+            result = await self._analyze_video_content(video_path, caption)
+        except BaseException:
+            # Only cancellation gets here; drop the entry and let any waiters re-run the
+            # analysis instead of cancelling the shared future under them
+            if self._cache.get(cache_key) is future:
+                del self._cache[cache_key]
+            future.set_exception(_AnalysisAbandoned(video_path))
+            future.exception()  # Mark retrieved so an unwaited future doesn't log a warning
+            raise
+        
+        if 'error' in result:
+            # Don't keep failed analyses around
+            self._cache.pop(cache_key, None)
+        future.set_result(result)
+        return result
+    
+    async def _analyze_video_content(self, video_path: str, caption: str = "") -> Dict:
+        """Run the full (uncached) analysis of a video"""
         try:
             logger.info(f"Analyzing video content: {os.path.basename(video_path)}")
             
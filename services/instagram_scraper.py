@@ -11,6 +11,9 @@ import requests
 from loguru import logger
 from config import settings
 
+# Connect and per-read timeout (seconds) for video downloads
+DOWNLOAD_TIMEOUT = 30
+
 class InstagramScraper:
     """Service for scraping Instagram content"""
     
@@ -138,13 +141,8 @@ class InstagramScraper:
             filename = f"{shortcode}.mp4"
             file_path = os.path.join(settings.storage_path, filename)
             
-            # Download video
-            response = requests.get(video_url, stream=True)
-            response.raise_for_status()
-            
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            # Download video in one worker-thread hop so the event loop never blocks on it
+            await asyncio.to_thread(self._download_to_file, video_url, file_path)
             
             logger.info(f"Video downloaded successfully: {file_path}")
             return file_path
@@ -153,6 +151,15 @@ class InstagramScraper:
             logger.error(f"Error downloading video {shortcode}: {str(e)}")
             return None
     
+    @staticmethod
+    def _download_to_file(video_url: str, file_path: str):
+        """Stream a video to disk, closing the connection even if the download fails"""
+        with requests.get(video_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(file_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+    
     async def get_post_by_shortcode(self, shortcode: str) -> Optional[Dict]:
         """
         Get a specific post by its shortcode
@@ -66,11 +66,11 @@ class TwitterPoster:
                 if media_id:
                     media_ids.append(media_id)
             
-            # Post tweet
+            # Post tweet; tweepy blocks (and may sleep on rate limits), so keep it off the event loop
             if media_ids:
-                response = self.client.create_tweet(text=text, media_ids=media_ids)
+                response = await asyncio.to_thread(self.client.create_tweet, text=text, media_ids=media_ids)
             else:
-                response = self.client.create_tweet(text=text)
+                response = await asyncio.to_thread(self.client.create_tweet, text=text)
             
             if response.data:
                 tweet_id = response.data['id']
@@ -110,14 +110,15 @@ class TwitterPoster:
                 logger.error(f"Media file not found: {media_path}")
                 return None
             
-            # Upload media
+            # Upload media off the event loop
             if media_type == 'video':
-                media_obj = self.api_v1.media_upload(
+                media_obj = await asyncio.to_thread(
+                    self.api_v1.media_upload,
                     filename=media_path,
                     media_category='tweet_video'
                 )
             else:
-                media_obj = self.api_v1.media_upload(filename=media_path)
+                media_obj = await asyncio.to_thread(self.api_v1.media_upload, filename=media_path)
             
             logger.info(f"Media uploaded successfully: {media_obj.media_id}")
             return media_obj.media_id
@@ -167,7 +168,7 @@ class TwitterPoster:
         Get engagement metrics for tweets
         
         Args:
-            tweet_ids: List of tweet IDs
+            tweet_ids: List of up to 100 tweet IDs
             
         Returns:
             Metrics dictionary
@@ -178,25 +179,31 @@ class TwitterPoster:
             
             metrics = {}
             
-            for tweet_id in tweet_ids:
-                try:
-                    tweet = self.client.get_tweet(
-                        tweet_id,
-                        tweet_fields=['public_metrics', 'created_at']
-                    )
+            try:
+                # One lookup for the whole batch (up to 100 IDs per request)
+                response = await asyncio.to_thread(
+                    self.client.get_tweets,
+                    ids=tweet_ids,
+                    tweet_fields=['public_metrics', 'created_at']
+                )
+                
+                for tweet in response.data or []:
+                    metrics[str(tweet.id)] = {
+                        'retweet_count': tweet.public_metrics['retweet_count'],
+                        'like_count': tweet.public_metrics['like_count'],
+                        'reply_count': tweet.public_metrics['reply_count'],
+                        'quote_count': tweet.public_metrics['quote_count'],
+                        'created_at': str(tweet.created_at)
+                    }
+                
+                for tweet_id in tweet_ids:
+                    if str(tweet_id) not in metrics:
+                        metrics[str(tweet_id)] = {'error': 'Tweet not found'}
                     
-                    if tweet.data:
-                        metrics[tweet_id] = {
-                            'retweet_count': tweet.data.public_metrics['retweet_count'],
-                            'like_count': tweet.data.public_metrics['like_count'],
-                            'reply_count': tweet.data.public_metrics['reply_count'],
-                            'quote_count': tweet.data.public_metrics['quote_count'],
-                            'created_at': str(tweet.data.created_at)
-                        }
-                        
-                except Exception as e:
-                    logger.error(f"Error getting metrics for tweet {tweet_id}: {str(e)}")
-                    metrics[tweet_id] = {'error': str(e)}
+            except Exception as e:
+                logger.error(f"Error getting metrics for tweets {tweet_ids}: {str(e)}")
+                for tweet_id in tweet_ids:
+                    metrics[str(tweet_id)] = {'error': str(e)}
             
             return metrics
             
@@ -270,7 +277,8 @@ class LinkedInPoster:
                     ]
             
             # Make API call (simplified)
-            # In production, use proper LinkedIn API endpoints
+            # In production, use proper LinkedIn API endpoints; the simulated call has no
+            # response headers, so no 'retry_after' is reported until the real call is wired in
             post_id = f"linkedin_post_{asyncio.get_event_loop().time()}"
             
             logger.info(f"LinkedIn post created successfully: {post_id}")
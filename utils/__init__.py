@@ -5,9 +5,11 @@ Utility modules for the Instagram-to-Social Media transformation system
 from .video_processor import VideoProcessor
 from .text_generator import TextGenerator
 from .api_clients import APIClientManager
+from .llm_cache import LLMCache
 
 __all__ = [
     "VideoProcessor",
     "TextGenerator",
-    "APIClientManager"
+    "APIClientManager",
+    "LLMCache"
 ]
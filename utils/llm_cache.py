@@ -0,0 +1,50 @@
+"""
+LLM Response Cache - Skips repeated text generation for identical prompts
+"""
+from typing import Optional
+from config import settings
+from semantic_cache import SemanticCache
+
+class LLMCache:
+    """Exact-match cache with a time-to-live, keyed by platform and prompt"""
+    
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 ttl: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite database file (defaults to settings.llm_cache_path)
+            ttl: Entry lifetime in seconds (defaults to settings.llm_cache_ttl)
+        """
+        self.db_path = db_path or settings.llm_cache_path
+        self.ttl = ttl if ttl is not None else settings.llm_cache_ttl
+        self.cache = SemanticCache(self.db_path, ttl=self.ttl)
+    
+    @staticmethod
+    def make_key(platform: str, prompt: str) -> str:
+        """Build the cache text for a platform/prompt pair"""
+        return f"{platform}\0{prompt}"
+    
+    def get(self, platform: str, prompt: str) -> Optional[str]:
+        """
+        Look up a cached response
+        
+        Args:
+            platform: Target platform the prompt was generated for
+            prompt: Full prompt text
+        
+        Returns:
+            Cached response or None on a miss
+        """
+        return self.cache.get_exact(self.make_key(platform, prompt))
+    
+    def set(self, platform: str, prompt: str, response: str):
+        """
+        Store a generated response
+        
+        Args:
+            platform: Target platform the prompt was generated for
+            prompt: Full prompt text
+            response: Generated text
+        """
+        self.cache.set(self.make_key(platform, prompt), None, response)
@@ -0,0 +1,77 @@
+"""
+Posting Schedule Utilities - Best-time-to-post ranking over 15-minute buckets of the day
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+from loguru import logger
+from config import settings
+
+BUCKET_MINUTES = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES  # 96
+
+def load_bucket_ranking(platform: str) -> Optional[List[int]]:
+    """
+    Load the ranked posting buckets for a platform
+    
+    The schedule file maps each platform to 96 scores, one per 15-minute bucket
+    of the day (e.g. aggregated audience reaction frequency), computed offline.
+    
+    Args:
+        platform: Platform name ('twitter' or 'linkedin')
+    
+    Returns:
+        Bucket indices sorted from best to worst, or None if no schedule is configured
+    """
+    path = settings.posting_schedule_path
+    if not path or not os.path.exists(path):
+        return None
+    
+    try:
+        with open(path, 'r') as f:
+            scores = json.load(f).get(platform)
+        
+        if not scores or len(scores) != BUCKETS_PER_DAY:
+            logger.warning(f"Posting schedule for {platform} must have {BUCKETS_PER_DAY} scores, ignoring it")
+            return None
+        
+        return sorted(range(BUCKETS_PER_DAY), key=lambda bucket: scores[bucket], reverse=True)
+    
+    except Exception as e:
+        logger.error(f"Error loading posting schedule: {str(e)}")
+        return None
+
+def bucket_to_datetime(bucket: int, after: datetime) -> datetime:
+    """
+    Get the next start of a bucket at or after a given time
+    
+    Args:
+        bucket: Bucket index (0-95)
+        after: Earliest allowed time
+    
+    Returns:
+        Datetime of the bucket start
+    """
+    day_start = after.replace(hour=0, minute=0, second=0, microsecond=0)
+    candidate = day_start + timedelta(minutes=bucket * BUCKET_MINUTES)
+    if candidate < after:
+        candidate += timedelta(days=1)
+    return candidate
+
+def ranked_schedule(ranking: List[int], count: int, after: datetime) -> List[datetime]:
+    """
+    Assign posting times from best bucket down, wrapping to following days
+    
+    Args:
+        ranking: Bucket indices sorted from best to worst
+        count: Number of posts to schedule
+        after: Earliest allowed time
+    
+    Returns:
+        List of posting times, one per post
+    """
+    return [
+        bucket_to_datetime(ranking[i % len(ranking)], after) + timedelta(days=i // len(ranking))
+        for i in range(count)
+    ]
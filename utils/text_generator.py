@@ -2,7 +2,7 @@
 Text Generation Utilities using AI models
 """
 import asyncio
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import openai
 from anthropic import Anthropic
 from loguru import logger
@@ -40,18 +40,63 @@ class TextGenerator:
         Returns:
             Generated text
         """
+        text, _ = await self.generate_text_with_status(prompt, max_length, model)
+        return text
+    
+    async def generate_text_with_status(self, prompt: str, max_length: int = 280,
+                                        model: str = "openai") -> Tuple[str, bool]:
+        """
+        Generate text using AI models, reporting whether the canned fallback was used
+        
+        Args:
+            prompt: Input prompt for text generation
+            max_length: Maximum length of generated text
+            model: Model to use ("openai" or "anthropic")
+            
+        Returns:
+            (text, is_fallback) tuple; fallback text must not be cached as model output
+        """
         try:
             if model == "openai" and self.openai_available:
-                return await self._generate_with_openai(prompt, max_length)
+                return await self._generate_with_openai(prompt, max_length), False
             elif model == "anthropic" and self.anthropic_available:
-                return await self._generate_with_anthropic(prompt, max_length)
+                return await self._generate_with_anthropic(prompt, max_length), False
             else:
                 logger.warning(f"Model {model} not available, using fallback")
-                return await self._generate_fallback(prompt, max_length)
+                return await self._generate_fallback(prompt, max_length), True
                 
         except Exception as e:
             logger.error(f"Error generating text: {str(e)}")
-            return await self._generate_fallback(prompt, max_length)
+            return await self._generate_fallback(prompt, max_length), True
+    
+    async def generate_text_batch(self, prompts: List[str], max_length: int = 280,
+                                  model: str = "openai", prefix: str = "") -> List[Tuple[str, bool]]:
+        """
+        Generate text for several prompts that share a common static prefix
+        
+        Args:
+            prompts: Input prompts, each starting with ``prefix``
+            max_length: Maximum length of each generated text
+            model: Model to use ("openai" or "anthropic")
+            prefix: Shared template prefix, marked cacheable where the provider supports it
+            
+        Returns:
+            (text, is_fallback) tuples, in the same order as ``prompts``
+        """
+        semaphore = asyncio.Semaphore(settings.max_concurrency)
+        
+        async def _generate_one(prompt: str) -> Tuple[str, bool]:
+            async with semaphore:
+                if model == "anthropic" and self.anthropic_available and prefix and prompt.startswith(prefix):
+                    try:
+                        return await self._generate_with_anthropic(prompt, max_length, prefix=prefix), False
+                    except Exception as e:
+                        logger.error(f"Error generating text: {str(e)}")
+                        return await self._generate_fallback(prompt, max_length), True
+                # OpenAI caches identical prompt prefixes automatically
+                return await self.generate_text_with_status(prompt, max_length, model)
+        
+        return await asyncio.gather(*[_generate_one(prompt) for prompt in prompts])
     
     async def _generate_with_openai(self, prompt: str, max_length: int) -> str:
         """Generate text using OpenAI GPT"""
@@ -84,16 +129,33 @@ class TextGenerator:
             logger.error(f"OpenAI generation error: {str(e)}")
             raise
     
-    async def _generate_with_anthropic(self, prompt: str, max_length: int) -> str:
+    async def _generate_with_anthropic(self, prompt: str, max_length: int, prefix: str = "") -> str:
         """Generate text using Anthropic Claude"""
         try:
+            instruction = f"Generate social media content (max {max_length} characters): "
+            if prefix:
+                # Send the shared prefix as its own cacheable block
+                content = [
+                    {
+                        "type": "text",
+                        "text": instruction + prefix,
+                        "cache_control": {"type": "ephemeral"}
+                    },
+                    {
+                        "type": "text",
+                        "text": prompt[len(prefix):]
+                    }
+                ]
+            else:
+                content = instruction + prompt
+            
             message = self.anthropic.messages.create(
                 model="claude-3-sonnet-20240229",
                 max_tokens=max_length // 2,
                 messages=[
                     {
                         "role": "user",
-                        "content": f"Generate social media content (max {max_length} characters): {prompt}"
+                        "content": content
                     }
                 ]
             )